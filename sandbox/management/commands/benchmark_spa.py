@@ -0,0 +1,268 @@
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.test import APIRequestFactory
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Page, Site
+
+from sandbox.models import BarPage, FooPage
+from wagtail_spa_integration.cache import get_cache
+from wagtail_spa_integration.utils import hash_draft_code
+from wagtail_spa_integration.views import SPAExtendedPagesAPIEndpoint
+
+BASELINE_PATH = Path(__file__).resolve().parents[2] / "benchmark_baseline.json"
+DRAFT_CODE = "benchmark"
+
+
+@contextmanager
+def count_queries() -> Iterator[list[str]]:
+    """
+    Collect the SQL run inside the block. Unlike CaptureQueriesContext this survives
+    the query log reset done when the test client starts a request.
+    """
+    queries: list[str] = []
+
+    def execute(execute: Any, sql: str, params: Any, many: bool, context: Any) -> Any:
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(execute):
+        yield queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the SPA API endpoints against a synthetic page tree in a throwaway "
+        "test database, and fail when query counts or latency regress from the baseline"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--depth", type=int, default=3)
+        parser.add_argument("--breadth", type=int, default=4)
+        parser.add_argument("--revisions", type=int, default=2)
+        parser.add_argument("--redirects", type=int, default=200)
+        parser.add_argument("--sites", type=int, default=2)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the results as the new baseline instead of comparing",
+        )
+        parser.add_argument(
+            "--latency-tolerance",
+            type=float,
+            default=None,
+            help="Also fail when a median latency exceeds the baseline by this factor",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        params = {
+            key: options[key]
+            for key in ("depth", "breadth", "revisions", "redirects", "sites")
+        }
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(PREVIEW_DRAFT_CODE=DRAFT_CODE):
+                fixtures = self.build_tree(**params)
+                results = self.run_benchmarks(fixtures, options["repeat"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.print_results(results)
+        if options["save_baseline"]:
+            options["baseline"].write_text(
+                json.dumps({"params": params, "results": results}, indent=4) + "\n"
+            )
+            self.stdout.write(f"Saved baseline to {options['baseline']}")
+        else:
+            self.compare(results, params, options["baseline"], options)
+
+    def build_tree(
+        self, depth: int, breadth: int, revisions: int, redirects: int, sites: int
+    ) -> dict[str, Any]:
+        root = Page.get_first_root_node()
+        site_roots = []
+        for i in range(sites):
+            site_root = root.add_child(instance=FooPage(title=f"Site {i}", live=False))
+            site_root.save_revision().publish()
+            Site.objects.create(
+                hostname=f"site{i}.example.com", root_page=site_root, site_name=f"{i}"
+            )
+            site_roots.append(site_root)
+
+        def add_children(parent: Page, level: int) -> Page:
+            deepest = parent
+            for i in range(breadth):
+                page_class = FooPage if i % 2 else BarPage
+                page = parent.add_child(
+                    instance=page_class(title=f"Page {level}-{i}", live=False)
+                )
+                page.save_revision().publish()
+                for revision in range(revisions - 1):
+                    page.title = f"Page {level}-{i} edit {revision}"
+                    page.save_revision()
+                if level < depth:
+                    deepest = add_children(page, level + 1)
+            return deepest
+
+        deepest = add_children(site_roots[0], 1)
+        site = Site.objects.get(root_page=site_roots[0])
+        Redirect.objects.bulk_create(
+            Redirect(
+                old_path=f"/old/{i}",
+                redirect_link=f"https://example.com/{i}",
+                site=site if i % 2 else None,
+            )
+            for i in range(redirects)
+        )
+
+        draft = deepest.specific
+        draft.slug = "draft-only"
+        draft.save_revision()
+        preview = FooPage.objects.filter(depth__gt=2).first()
+        preview.title = "Preview"
+        token = preview.create_page_preview().token
+
+        return {
+            "site": site,
+            "live_path": deepest.url_path[len(site_roots[0].url_path) - 1 :],
+            "draft_path": draft.get_parent().url_path[len(site_roots[0].url_path) - 1 :]
+            + "draft-only/",
+            "draft_code": hash_draft_code(DRAFT_CODE, draft.pk),
+            "preview_token": token,
+        }
+
+    def get_benchmarks(self, fixtures: dict[str, Any]) -> dict[str, Callable[[], Any]]:
+        client = Client()
+        site = fixtures["site"]
+        hostname = site.hostname
+
+        def get(url: str, params: dict[str, str]) -> Callable[[], Any]:
+            def request() -> Any:
+                response = client.get(url, params)
+                if response.status_code != 200:
+                    raise CommandError(
+                        f"{url} {params} returned {response.status_code}"
+                    )
+                return b"".join(response) if response.streaming else response.content
+
+            return request
+
+        endpoint = SPAExtendedPagesAPIEndpoint()
+        route_request = APIRequestFactory().get("/")
+        path_components = [part for part in fixtures["live_path"].split("/") if part]
+
+        return {
+            "detail_by_path": get(
+                "/api/v2/pages/detail_by_path/",
+                {"html_path": fixtures["live_path"], "site": hostname},
+            ),
+            "detail_by_path_draft": get(
+                "/api/v2/pages/detail_by_path/",
+                {
+                    "html_path": fixtures["draft_path"],
+                    "site": hostname,
+                    "draft": fixtures["draft_code"],
+                },
+            ),
+            "route": lambda: endpoint.route(
+                site.root_page, route_request, path_components
+            ),
+            "listing_exclude_type": get(
+                "/api/v2/pages/",
+                {"exclude_type": "sandbox.BarPage", "site": hostname, "limit": "20"},
+            ),
+            "redirects": get("/api/v2/redirects/", {"site": hostname}),
+            "page_preview": get(
+                "/api/v2/page_preview/1/",
+                {
+                    "content_type": "sandbox.foopage",
+                    "token": fixtures["preview_token"],
+                },
+            ),
+            "sitemap": get("/sitemap.xml", {"site": hostname}),
+        }
+
+    def run_benchmarks(
+        self, fixtures: dict[str, Any], repeat: int
+    ) -> dict[str, dict[str, float]]:
+        results = {}
+        for name, benchmark in self.get_benchmarks(fixtures).items():
+            get_cache().clear()
+            with count_queries() as cold_queries:
+                benchmark()
+            with count_queries() as queries:
+                benchmark()
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                benchmark()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {
+                "cold_queries": len(cold_queries),
+                "queries": len(queries),
+                "median_ms": round(statistics.median(timings), 3),
+            }
+        return results
+
+    def print_results(self, results: dict[str, dict[str, float]]) -> None:
+        self.stdout.write(
+            f"{'benchmark':<24}{'cold queries':>14}{'queries':>10}{'ms':>10}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24}{result['cold_queries']:>14}{result['queries']:>10}"
+                f"{result['median_ms']:>10.2f}"
+            )
+
+    def compare(
+        self,
+        results: dict[str, dict[str, float]],
+        params: dict[str, int],
+        path: Path,
+        options: dict[str, Any],
+    ) -> None:
+        if not path.exists():
+            self.stdout.write(f"No baseline at {path}, run with --save-baseline")
+            return
+        baseline = json.loads(path.read_text())
+        if baseline["params"] != params:
+            raise CommandError(
+                f"Baseline was recorded with {baseline['params']}, not {params}"
+            )
+
+        regressions = []
+        tolerance = options["latency_tolerance"]
+        for name, result in results.items():
+            expected = baseline["results"].get(name)
+            if expected is None:
+                continue
+            for key in ("cold_queries", "queries"):
+                if result[key] > expected[key]:
+                    regressions.append(
+                        f"{name}: {key} {expected[key]} -> {result[key]}"
+                    )
+            if tolerance and result["median_ms"] > expected["median_ms"] * tolerance:
+                regressions.append(
+                    f"{name}: median_ms {expected['median_ms']} -> {result['median_ms']}"
+                )
+        if regressions:
+            raise CommandError("Regressions:\n" + "\n".join(regressions))
+        self.stdout.write("No regressions")
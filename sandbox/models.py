@@ -1,17 +1,39 @@
 from typing import ClassVar
 
 from django.db import models
-from wagtail.admin.panels import FieldPanel
+from modelcluster.fields import ParentalKey
+from wagtail.admin.panels import FieldPanel, InlinePanel
 from wagtail.api import APIField
-from wagtail.models import Page
+from wagtail.models import Orderable, Page
 from wagtail_headless_preview.models import HeadlessPreviewMixin
 
 
 class FooPage(HeadlessPreviewMixin, Page):
     body = models.CharField(max_length=255, blank=True)
+    related_page = models.ForeignKey(
+        Page, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
 
-    content_panels: ClassVar = Page.content_panels + [FieldPanel("body")]
-    api_fields: ClassVar = [APIField("body")]
+    content_panels: ClassVar = Page.content_panels + [
+        FieldPanel("body"),
+        FieldPanel("related_page"),
+        InlinePanel("links"),
+    ]
+    api_fields: ClassVar = [
+        APIField("body"),
+        APIField("related_page"),
+        APIField("links"),
+    ]
+
+
+class FooPageLink(Orderable):
+    page = ParentalKey(FooPage, on_delete=models.CASCADE, related_name="links")
+    title = models.CharField(max_length=255)
+    link_page = models.ForeignKey(
+        Page, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+
+    api_fields: ClassVar = [APIField("title"), APIField("link_page")]
 
 
 class BarPage(HeadlessPreviewMixin, Page):
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "taggit",
     "rest_framework",
     "wagtail_headless_preview",
+    "wagtail_spa_integration",
     "django_filters",
     "django.contrib.admin",
     "django.contrib.auth",
@@ -5,3 +5,6 @@ class WagtailSPAIntegrationAppConfig(AppConfig):
     name = "wagtail_spa_integration"
     verbose_name = "Wagtail SPA integration"
     default_auto_field = "django.db.models.AutoField"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
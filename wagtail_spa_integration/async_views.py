@@ -0,0 +1,202 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpRequest
+from django.http.response import HttpResponseBase
+from django.urls import URLPattern
+from rest_framework.request import Request
+from rest_framework.response import Response
+from wagtail.models import Page, Site
+
+from .indexes import afind_page_id_by_path, aroute_draft_candidates
+from .redirects import aresolve_redirect
+from .sites import afind_sites
+from .utils import hash_draft_code
+from .views import PAGE_STATE_FIELDS, RedirectViewSet, SPAExtendedPagesAPIEndpoint
+
+AsyncView = Callable[..., Awaitable[HttpResponseBase]]
+
+
+def as_async_view(view: AsyncView) -> AsyncView:
+    # WagtailAPIRouter wraps views in a sync function with functools.wraps, which
+    # copies this marker, so Django still awaits the wrapped view
+    return markcoroutinefunction(view)
+
+
+async def aget_request_site(request: HttpRequest) -> Site | None:
+    """The site named by the `site` query parameter, or else the site of the request"""
+    if "site" in request.GET:
+        sites = await afind_sites(request.GET["site"])
+        return sites[0] if len(sites) == 1 else None
+    return await sync_to_async(Site.find_for_request)(request)
+
+
+async def aget_draft_page_state(pk: int) -> dict[str, Any] | None:
+    """Async version of SPAExtendedPagesAPIEndpoint.get_page_state() for drafts"""
+    return await Page.objects.filter(pk=pk).values(*PAGE_STATE_FIELDS).afirst()  # type: ignore[no-any-return]
+
+
+def get_draft_page_state(page: Page) -> dict[str, Any]:
+    return {field: getattr(page, field) for field in PAGE_STATE_FIELDS}
+
+
+def is_valid_draft_code(request: HttpRequest, page_id: int) -> bool:
+    settings_draft_code = getattr(settings, "PREVIEW_DRAFT_CODE", None)
+    user_draft_code = request.GET.get("draft")
+    return bool(
+        settings_draft_code
+        and user_draft_code
+        and user_draft_code == hash_draft_code(settings_draft_code, page_id)
+    )
+
+
+def replace_views(
+    urlpatterns: list[URLPattern], views: dict[str, AsyncView]
+) -> list[URLPattern]:
+    return [
+        URLPattern(
+            pattern.pattern, views[pattern.name], pattern.default_args, pattern.name
+        )
+        if pattern.name in views
+        else pattern
+        for pattern in urlpatterns
+    ]
+
+
+class AsyncSPAPagesAPIEndpoint(SPAExtendedPagesAPIEndpoint):
+    """
+    SPAExtendedPagesAPIEndpoint with async `detail` and `detail_by_path` views for ASGI
+    deployments. Site lookup, path index lookup, draft routing, the draft code check and
+    the page state of drafts use the async ORM. The page state of live pages is read by
+    the sync view in a worker thread, since it depends on the view restrictions of the
+    request, and so is serializing the page. Paths missing from the path index are
+    routed by the sync view, which also builds not found responses.
+
+    Draft routing doesn't call `route_candidates`, subclasses overriding it should use
+    the sync endpoint.
+    """
+
+    def resolved_detail_view(
+        self, request: Request, pk: int, draft_state: dict[str, Any] | None = None
+    ) -> HttpResponseBase:
+        """
+        Detail response for a page the async view already resolved, draft_state is the
+        page state of the draft when the request has a valid draft code
+        """
+        if draft_state is None:
+            return self.detail_view(request, pk)
+        self.resolved_draft_state = (pk, draft_state)
+        return self.detail_view(request, pk, is_draft_code_valid=True)
+
+    def resolved_detail_by_path_view(
+        self, request: Request, pk: int, draft_state: dict[str, Any] | None = None
+    ) -> HttpResponseBase:
+        """Detail response for a page the async detail_by_path view already resolved"""
+        return self.resolved_detail_view(request, pk, draft_state)
+
+    @classmethod
+    def get_urlpatterns(cls) -> list[URLPattern]:
+        detail: AsyncView = sync_to_async(cls.as_view({"get": "detail_view"}))
+        resolved_detail: AsyncView = sync_to_async(
+            cls.as_view({"get": "resolved_detail_view"})
+        )
+        resolved_detail_by_path: AsyncView = sync_to_async(
+            cls.as_view({"get": "resolved_detail_by_path_view"})
+        )
+        detail_by_path: AsyncView = sync_to_async(
+            cls.as_view({"get": "detail_by_path_view"})
+        )
+
+        async def detail_view(request: HttpRequest, pk: int) -> HttpResponseBase:
+            if "site" in request.GET:
+                # Warm the site index without blocking, the sync view reuses it
+                await afind_sites(request.GET["site"])
+            if is_valid_draft_code(request, pk):
+                draft_state = await aget_draft_page_state(pk)
+                if draft_state is not None:
+                    return await resolved_detail(
+                        request, pk=pk, draft_state=draft_state
+                    )
+            return await detail(request, pk=pk)
+
+        async def detail_by_path_view(request: HttpRequest) -> HttpResponseBase:
+            html_path = request.GET.get("html_path")
+            site = await aget_request_site(request)
+            if html_path is None or site is None:
+                return await detail_by_path(request)
+
+            if request.GET.get("draft"):
+                path_components = [
+                    component for component in html_path.split("/") if component
+                ]
+                candidates = await aroute_draft_candidates(
+                    site.root_page, path_components
+                )
+                if not candidates:
+                    # The sync view builds the not found response
+                    return await detail_by_path(request)
+                for candidate in candidates:
+                    if is_valid_draft_code(request, candidate.pk):
+                        return await resolved_detail_by_path(
+                            request,
+                            pk=candidate.pk,
+                            draft_state=get_draft_page_state(candidate),
+                        )
+
+            page_id = await afind_page_id_by_path(site, html_path)
+            if page_id is None:
+                return await detail_by_path(request)
+            return await resolved_detail_by_path(request, pk=page_id)
+
+        return replace_views(
+            super().get_urlpatterns(),
+            {
+                "detail": as_async_view(detail_view),
+                "detail_by_path": as_async_view(detail_by_path_view),
+            },
+        )
+
+
+class AsyncRedirectViewSet(RedirectViewSet):
+    """
+    RedirectViewSet with an async `resolve` view for ASGI deployments. Site lookup and
+    redirect resolution are async, the response is rendered by the sync view in a worker
+    thread, so it has the same renderers, surrogate keys and error bodies. Requests
+    without `html_path` or with an unknown `site` are answered by the sync view.
+    """
+
+    def resolved_resolve_view(
+        self, request: Request, redirect: dict[str, Any] | None
+    ) -> Response:
+        """Response for the redirect the async resolve view already looked up"""
+        if redirect is None:
+            raise Http404("not found")
+        return Response(redirect)
+
+    @classmethod
+    def get_urlpatterns(cls) -> list[URLPattern]:
+        resolve: AsyncView = sync_to_async(cls.as_view({"get": "resolve"}))
+        resolved_resolve: AsyncView = sync_to_async(
+            cls.as_view({"get": "resolved_resolve_view"})
+        )
+
+        async def resolve_view(request: HttpRequest) -> HttpResponseBase:
+            if "html_path" not in request.GET:
+                return await resolve(request)
+            site: Site | None
+            if "site" in request.GET:
+                sites = await afind_sites(request.GET["site"])
+                if len(sites) != 1:
+                    return await resolve(request)
+                site = sites[0]
+            else:
+                site = await sync_to_async(Site.find_for_request)(request)
+
+            redirect = await aresolve_redirect(site, request.GET["html_path"])
+            return await resolved_resolve(request, redirect=redirect)
+
+        return replace_views(
+            super().get_urlpatterns(), {"resolve": as_async_view(resolve_view)}
+        )
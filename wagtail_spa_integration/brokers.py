@@ -0,0 +1,87 @@
+from functools import lru_cache
+import queue
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class PreviewSubscription:
+    def get(self, timeout: float) -> str | None:
+        """Next message, or None when nothing was published within timeout seconds"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class PreviewBroker:
+    """
+    Delivers preview update notifications to stream subscribers. Set SPA_PREVIEW_BROKER to
+    the dotted path of a subclass to deliver them across processes, e.g. with redis pub/sub.
+    """
+
+    def subscribe(self, channel: str) -> PreviewSubscription:
+        raise NotImplementedError
+
+    def publish(self, channel: str, message: str) -> None:
+        raise NotImplementedError
+
+
+class LocalPreviewSubscription(PreviewSubscription):
+    def __init__(self, broker: "LocalPreviewBroker", channel: str) -> None:
+        self.broker = broker
+        self.channel = channel
+        self.queue: queue.Queue[str] = queue.Queue()
+
+    def get(self, timeout: float) -> str | None:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class LocalPreviewBroker(PreviewBroker):
+    """In process broker, subscribers only see previews saved by the same process"""
+
+    def __init__(self) -> None:
+        self.subscriptions: dict[str, set[LocalPreviewSubscription]] = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> LocalPreviewSubscription:
+        subscription = LocalPreviewSubscription(self, channel)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: LocalPreviewSubscription) -> None:
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.channel, None)
+
+    def publish(self, channel: str, message: str) -> None:
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.queue.put(message)
+
+
+@lru_cache
+def get_preview_broker() -> PreviewBroker:
+    broker_class = import_string(
+        getattr(
+            settings,
+            "SPA_PREVIEW_BROKER",
+            "wagtail_spa_integration.brokers.LocalPreviewBroker",
+        )
+    )
+    return broker_class()  # type: ignore[no-any-return]
+
+
+def preview_channel(content_type_id: int, token: str) -> str:
+    return f"preview:{content_type_id}:{token}"
@@ -0,0 +1,79 @@
+from collections.abc import Iterable
+from typing import Any
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+KEY_PREFIX = "wagtail_spa_integration"
+
+
+def get_cache() -> BaseCache:
+    return caches[getattr(settings, "SPA_CACHE_ALIAS", "default")]
+
+
+def get_version(name: str) -> str:
+    """
+    Current version token of a named set of cached data. Embed it in cache keys and
+    call bump_version() to invalidate every key built from it at once.
+    """
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:version:{name}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return str(version)
+
+
+async def aget_version(name: str) -> str:
+    """Async version of get_version()"""
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:version:{name}"
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid4().hex, None)
+        version = await cache.aget(key)
+    return str(version)
+
+
+def bump_version(name: str) -> None:
+    get_cache().set(f"{KEY_PREFIX}:version:{name}", uuid4().hex, None)
+
+
+def bump_versions(names: Iterable[str]) -> None:
+    get_cache().set_many(
+        {f"{KEY_PREFIX}:version:{name}": uuid4().hex for name in names}, None
+    )
+
+
+PAGES_VERSION = "pages"
+
+
+def page_version_name(page_id: int) -> str:
+    return f"page:{page_id}"
+
+
+def get_response_cache_config(
+    endpoint: str, page_types: Iterable[str] = ()
+) -> dict[str, Any] | None:
+    """
+    Response cache configuration if responses of endpoint (`detail`, `detail_by_path` or
+    `listing`) for the given `app_label.Model` page types should be cached. Configured with
+    SPA_RESPONSE_CACHE, e.g.
+
+        SPA_RESPONSE_CACHE = {
+            "ENDPOINTS": ["detail", "detail_by_path", "listing"],
+            "PAGE_TYPES": ["blog.BlogPage"],  # Optional, defaults to all page types
+            "TIMEOUT": 300,
+        }
+    """
+    config: dict[str, Any] | None = getattr(settings, "SPA_RESPONSE_CACHE", None)
+    if not config or endpoint not in config.get("ENDPOINTS", ()):
+        return None
+    if config.get("PAGE_TYPES") is not None:
+        allowed = {page_type.lower() for page_type in config["PAGE_TYPES"]}
+        requested = {page_type.lower() for page_type in page_types}
+        if not requested or not requested <= allowed:
+            return None
+    return config
@@ -0,0 +1,35 @@
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Page
+
+from .indexes import get_site_paths
+from .models import ChangeLogEntry
+
+
+def log_page_change(
+    action: str, page: Page, old_url_path: str | None, new_url_path: str | None
+) -> None:
+    """
+    Add a change log entry for every site serving page before or after the change.
+    Url paths are wagtail url_paths, None when the page wasn't or isn't served.
+    """
+    old_paths = get_site_paths(old_url_path) if old_url_path else {}
+    new_paths = get_site_paths(new_url_path) if new_url_path else {}
+    ChangeLogEntry.objects.bulk_create(
+        ChangeLogEntry(
+            action=action,
+            page_id=page.pk,
+            site_id=site_id,
+            old_path=old_paths.get(site_id, ""),
+            new_path=new_paths.get(site_id, ""),
+        )
+        for site_id in sorted(old_paths.keys() | new_paths.keys())
+    )
+
+
+def log_redirect_change(action: str, redirect: Redirect) -> None:
+    ChangeLogEntry.objects.create(
+        action=action,
+        page_id=redirect.redirect_page_id,
+        site_id=redirect.site_id,
+        old_path=redirect.old_path,
+    )
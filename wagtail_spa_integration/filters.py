@@ -1,7 +1,10 @@
-from typing import ClassVar
+from typing import Any, ClassVar
 
 from django_filters import rest_framework as filters
+from rest_framework.request import Request
+from wagtail.api.v2.filters import OrderingFilter
 from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import PageQuerySet
 
 
 class RedirectFilter(filters.FilterSet):
@@ -10,3 +13,17 @@ class RedirectFilter(filters.FilterSet):
     class Meta:
         model = Redirect
         fields: ClassVar = ["old_path", "site"]
+
+
+class SPAOrderingFilter(OrderingFilter):
+    """
+    Wagtail's ordering, except in cursor mode where SPAPagination orders the pages
+    itself, including by `path` which isn't an API field
+    """
+
+    def filter_queryset(
+        self, request: Request, queryset: PageQuerySet, view: Any
+    ) -> PageQuerySet:
+        if "cursor" in request.GET:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
@@ -1,14 +1,29 @@
 # Derived from https://github.com/torchbox/wagtail-headless-preview#example
 
+from collections.abc import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.handlers.asgi import ASGIRequest
+from django.core.signing import BadSignature
+from django.http import StreamingHttpResponse
+from django.urls import URLPattern, path
+from rest_framework.renderers import JSONRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
+from wagtail.api.v2.utils import BadRequestError
 from wagtail.api.v2.views import PagesAPIViewSet
 from wagtail.models import Page
 from wagtail_headless_preview.models import PagePreview
 
+from .brokers import PreviewSubscription, get_preview_broker, preview_channel
+from .previews import get_preview_content_type, get_preview_page
+from .renderers import ConfigurableRenderersMixin
+from .sites import set_request_site
+
 
-class PagePreviewAPIViewSet(PagesAPIViewSet):
+class PagePreviewAPIViewSet(ConfigurableRenderersMixin, PagesAPIViewSet):
     known_query_parameters = PagesAPIViewSet.known_query_parameters.union(
         ["content_type", "token"]
     )
@@ -23,16 +38,94 @@ class PagePreviewAPIViewSet(PagesAPIViewSet):
         serializer = self.get_serializer(page)
         return Response(serializer.data)
 
-    def get_object(self) -> Page:
-        app_label, model = self.request.GET["content_type"].split(".")
-        content_type = ContentType.objects.get(app_label=app_label, model=model)
+    def stream_view(self, request: Request) -> StreamingHttpResponse:
+        """
+        Server-sent events stream of a preview. Sends the serialized preview when it is
+        created or updated, and once on connect if it already exists. Under ASGI the
+        stream is an async iterator, which waits for updates without holding a thread
+        between keepalives.
+        """
+        set_request_site(request)
+        try:
+            content_type = get_preview_content_type(request.GET["content_type"])
+            token = request.GET["token"]
+        except (KeyError, ValueError, ContentType.DoesNotExist):
+            raise BadRequestError("content_type and token are required")
+        try:
+            content_type.model_class().get_preview_signer().unsign(token)  # type: ignore[union-attr]
+        except (AttributeError, BadSignature):
+            raise BadRequestError("invalid preview token")
 
-        page_preview = PagePreview.objects.get(
-            content_type=content_type, token=self.request.GET["token"]
+        subscription = get_preview_broker().subscribe(
+            preview_channel(content_type.pk, token)
         )
-        page = page_preview.as_page()
-        if not page.pk:
-            # fake primary key to stop API URL routing from complaining
-            page.pk = 0
+        events: Iterator[str] | AsyncIterator[str]
+        if isinstance(request._request, ASGIRequest):
+            # Django collects sync iterators in full before sending them under ASGI
+            events = self.aget_preview_events(content_type, token, subscription)
+        else:
+            events = self.get_preview_events(content_type, token, subscription)
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def get_preview_events(
+        self, content_type: ContentType, token: str, subscription: PreviewSubscription
+    ) -> Iterator[str]:
+        keepalive = getattr(settings, "SPA_PREVIEW_STREAM_KEEPALIVE", 15)
+        message: str | None = "connected"
+        try:
+            while True:
+                if message is None:
+                    yield ": keepalive\n\n"
+                else:
+                    event = self.get_preview_event(content_type, token)
+                    if event is not None:
+                        yield event
+                message = subscription.get(keepalive)
+        finally:
+            subscription.close()
+
+    async def aget_preview_events(
+        self, content_type: ContentType, token: str, subscription: PreviewSubscription
+    ) -> AsyncIterator[str]:
+        """Async version of get_preview_events()"""
+        keepalive = getattr(settings, "SPA_PREVIEW_STREAM_KEEPALIVE", 15)
+        get_event = sync_to_async(self.get_preview_event)
+        # Waiting on the broker blocks, so it gets a thread of its own
+        get_message = sync_to_async(subscription.get, thread_sensitive=False)
+        message: str | None = "connected"
+        try:
+            while True:
+                if message is None:
+                    yield ": keepalive\n\n"
+                else:
+                    event = await get_event(content_type, token)
+                    if event is not None:
+                        yield event
+                message = await get_message(keepalive)
+        finally:
+            subscription.close()
 
-        return page
+    def get_preview_event(self, content_type: ContentType, token: str) -> str | None:
+        """`preview` event with the serialized preview, None if it doesn't exist"""
+        try:
+            page = get_preview_page(content_type, token)
+        except PagePreview.DoesNotExist:
+            return None
+        data = JSONRenderer().render(self.get_serializer(page).data)
+        return "event: preview\ndata: " + data.decode() + "\n\n"
+
+    def get_object(self) -> Page:
+        set_request_site(self.request)
+        content_type = get_preview_content_type(self.request.GET["content_type"])
+        return get_preview_page(content_type, self.request.GET["token"])
+
+    @classmethod
+    def get_urlpatterns(cls) -> list[URLPattern]:
+        urlpatterns = super().get_urlpatterns()
+        urlpatterns.append(
+            path("stream/", cls.as_view({"get": "stream_view"}), name="stream")
+        )
+        return urlpatterns  # type: ignore[no-any-return]
@@ -0,0 +1,195 @@
+from django.db.models import F
+from wagtail.models import Page, PageQuerySet, Revision, Site
+
+from .models import PATH_MAX_LENGTH, DraftSlugIndex, PagePathIndex
+
+
+def normalize_html_path(html_path: str) -> str:
+    """Normalize an html_path the same way wagtail splits it, e.g. `foo/bar` -> `/foo/bar/`"""
+    components = [component for component in html_path.split("/") if component]
+    return "/" + "".join(component + "/" for component in components)
+
+
+def find_page_by_path(
+    queryset: PageQuerySet, site: Site, html_path: str
+) -> Page | None:
+    """
+    Look up a page in the path index, restricted to pages in queryset.
+
+    Returns None on an index miss or when the entry is stale, callers should fall back to
+    wagtail's tree routing.
+    """
+    path = normalize_html_path(html_path)
+    if len(path) > PATH_MAX_LENGTH:
+        return None
+    return queryset.filter(
+        spa_path_index__site=site,
+        spa_path_index__path=path,
+        spa_path_index__url_path=F("url_path"),
+    ).first()
+
+
+async def afind_page_id_by_path(site: Site, html_path: str) -> int | None:
+    """
+    Id of the live page the path index maps html_path to, None on a miss. Callers still
+    need to check the page is visible to the request.
+    """
+    path = normalize_html_path(html_path)
+    if len(path) > PATH_MAX_LENGTH:
+        return None
+    return await (
+        PagePathIndex.objects.filter(
+            site=site, path=path, url_path=F("page__url_path"), page__live=True
+        )
+        .values_list("page_id", flat=True)
+        .afirst()
+    )
+
+
+def find_page_ids_by_paths(
+    queryset: PageQuerySet, site: Site, html_paths: list[str]
+) -> dict[str, int]:
+    """html_path -> page id for every path found in the path index, in one query"""
+    html_paths_by_path: dict[str, list[str]] = {}
+    for html_path in html_paths:
+        path = normalize_html_path(html_path)
+        if len(path) <= PATH_MAX_LENGTH:
+            html_paths_by_path.setdefault(path, []).append(html_path)
+    if not html_paths_by_path:
+        return {}
+
+    page_ids: dict[str, int] = {}
+    for path, page_id in queryset.filter(
+        spa_path_index__site=site,
+        spa_path_index__path__in=html_paths_by_path,
+        spa_path_index__url_path=F("url_path"),
+    ).values_list("spa_path_index__path", "pk"):
+        for html_path in html_paths_by_path[path]:
+            page_ids[html_path] = page_id
+    return page_ids
+
+
+def index_page_path(site: Site, html_path: str, page: Page) -> None:
+    """
+    Record a page resolved through tree routing. Only pages served by wagtail's default
+    routing are recorded, a custom `route()` (such as RoutablePageMixin) may resolve paths
+    that don't correspond to a url_path.
+    """
+    path = normalize_html_path(html_path)
+    if len(path) > PATH_MAX_LENGTH:
+        return
+    if page.url_path != site.root_page.url_path + path[1:]:
+        return
+    PagePathIndex.objects.update_or_create(
+        site=site, path=path, defaults={"page": page, "url_path": page.url_path}
+    )
+
+
+def get_site_paths(url_path: str) -> dict[int, str]:
+    """Site id -> site relative path for every site serving the given page url_path"""
+    site_paths: dict[int, str] = {}
+    for root_path in Site.get_site_root_paths():
+        if root_path.site_id not in site_paths and url_path.startswith(
+            root_path.root_path
+        ):
+            site_paths[root_path.site_id] = "/" + url_path[len(root_path.root_path) :]
+    return site_paths
+
+
+def refresh_page_path_index(page: Page) -> None:
+    """
+    Bring the path index up to date after page was published, unpublished or moved.
+
+    Stale entries of descendants are dropped rather than rewritten, they are filled in
+    again the next time the path is requested.
+    """
+    PagePathIndex.objects.filter(page__path__startswith=page.path).exclude(
+        url_path=F("page__url_path")
+    ).delete()
+    if not page.live:
+        PagePathIndex.objects.filter(page=page).delete()
+        return
+    for site_id, path in get_site_paths(page.url_path).items():
+        if len(path) > PATH_MAX_LENGTH:
+            continue
+        PagePathIndex.objects.update_or_create(
+            site_id=site_id,
+            path=path,
+            defaults={"page": page, "url_path": page.url_path},
+        )
+
+
+def rebuild_page_path_index() -> int:
+    """Rebuild the path index for every live page, returns the number of entries written"""
+    PagePathIndex.objects.all().delete()
+    entries = []
+    for page_id, url_path in (
+        Page.objects.live().order_by("path").values_list("pk", "url_path").iterator()
+    ):
+        for site_id, path in get_site_paths(url_path).items():
+            if len(path) <= PATH_MAX_LENGTH:
+                entries.append(
+                    PagePathIndex(
+                        site_id=site_id, path=path, url_path=url_path, page_id=page_id
+                    )
+                )
+    PagePathIndex.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def get_draft_slug_candidates(page: Page, slug: str) -> PageQuerySet:
+    """
+    Descendants of page whose latest revision has the given slug, most recently edited first.
+    """
+    return Page.objects.filter(
+        spa_draft_slug__slug=slug,
+        path__startswith=page.path,
+        depth__gt=page.depth,
+    ).order_by("-latest_revision_created_at")
+
+
+def find_draft_slug_candidates(page: Page, slug: str) -> list[Page]:
+    return list(get_draft_slug_candidates(page, slug))
+
+
+async def aroute_draft_candidates(page: Page, path_components: list[str]) -> list[Page]:
+    """
+    Async version of SPAExtendedPagesAPIEndpoint.route_candidates(), every page the path
+    below page may refer to, including drafts, most recently edited first.
+    """
+    if not path_components:
+        return [page]
+    child_slug, remaining_components = path_components[0], path_components[1:]
+    subpage = await page.get_children().filter(slug=child_slug).afirst()
+    if subpage:
+        subpages = [subpage]
+    else:
+        subpages = [
+            candidate async for candidate in get_draft_slug_candidates(page, child_slug)
+        ]
+    candidates = []
+    for subpage in subpages:
+        candidates += await aroute_draft_candidates(subpage, remaining_components)
+    return candidates
+
+
+def index_revision_slug(revision: Revision) -> None:
+    slug = revision.content.get("slug")
+    if slug:
+        DraftSlugIndex.objects.update_or_create(
+            page_id=int(revision.object_id), defaults={"slug": slug}
+        )
+
+
+def rebuild_draft_slug_index() -> int:
+    """Rebuild the draft slug index from the latest revision of every page"""
+    DraftSlugIndex.objects.all().delete()
+    entries = [
+        DraftSlugIndex(page_id=page_id, slug=content["slug"])
+        for page_id, content in Page.objects.filter(latest_revision__isnull=False)
+        .values_list("pk", "latest_revision__content")
+        .iterator()
+        if content.get("slug")
+    ]
+    DraftSlugIndex.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
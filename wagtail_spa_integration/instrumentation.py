@@ -0,0 +1,108 @@
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class PhaseTiming:
+    name: str
+    duration: float  # milliseconds
+    queries: int
+
+
+class RequestTimer:
+    """
+    Time and queries spent in named phases of one request. A phase entered inside
+    another pauses the outer one, so every phase only counts its own work.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, PhaseTiming] = {}
+        self.stack: list[str] = []
+        self.started = perf_counter()
+
+    def phase(self, name: str) -> AbstractContextManager[None]:
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name: str) -> Iterator[None]:
+        self._switch(name)
+        try:
+            yield
+        finally:
+            self._switch(None)
+
+    def _switch(self, name: str | None) -> None:
+        now = perf_counter()
+        if self.stack:
+            self._get_phase(self.stack[-1]).duration += (now - self.started) * 1000
+        if name is None:
+            self.stack.pop()
+        else:
+            self.stack.append(name)
+        self.started = now
+
+    def _get_phase(self, name: str) -> PhaseTiming:
+        if name not in self.phases:
+            self.phases[name] = PhaseTiming(name, 0.0, 0)
+        return self.phases[name]
+
+    def record(self) -> AbstractContextManager[None]:
+        """Count the queries run inside the block against the current phase"""
+        return connection.execute_wrapper(self._count_query)
+
+    def _count_query(
+        self,
+        execute: Callable[..., Any],
+        sql: str,
+        params: Any,
+        many: bool,
+        context: dict[str, Any],
+    ) -> Any:
+        if self.stack:
+            self._get_phase(self.stack[-1]).queries += 1
+        return execute(sql, params, many, context)
+
+    def finish(self, request: HttpRequest, response: HttpResponseBase) -> None:
+        """Add the Server-Timing header and pass the timings to SPA_INSTRUMENTATION_HOOK"""
+        phases = list(self.phases.values())
+        response["Server-Timing"] = ", ".join(
+            f'{phase.name};dur={phase.duration:.2f};desc="{phase.queries} queries"'
+            for phase in phases
+        )
+        hook = getattr(settings, "SPA_INSTRUMENTATION_HOOK", None)
+        if hook:
+            if isinstance(hook, str):
+                hook = import_string(hook)
+            hook(request, phases)
+
+
+class DisabledRequestTimer(RequestTimer):
+    """Stands in for RequestTimer when instrumentation is off, records nothing"""
+
+    def phase(self, name: str) -> AbstractContextManager[None]:
+        return nullcontext()
+
+    def record(self) -> AbstractContextManager[None]:
+        return nullcontext()
+
+    def finish(self, request: HttpRequest, response: HttpResponseBase) -> None:
+        pass
+
+
+DISABLED_TIMER = DisabledRequestTimer()
+
+
+def get_request_timer() -> RequestTimer:
+    """A new RequestTimer when SPA_INSTRUMENTATION is set, else a shared no-op timer"""
+    if getattr(settings, "SPA_INSTRUMENTATION", False):
+        return RequestTimer()
+    return DISABLED_TIMER
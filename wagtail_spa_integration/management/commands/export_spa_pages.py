@@ -0,0 +1,180 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve
+from wagtail.models import Page, Site
+
+from ...sites import find_sites
+
+MANIFEST_NAME = ".spa-export.json"
+
+
+def init_worker() -> None:
+    import django
+
+    django.setup()
+
+
+def get_page_file(output_dir: str, path: str) -> Path:
+    """File holding the page served at a site relative path, e.g. foo/bar/index.json"""
+    return Path(output_dir, path.strip("/"), "index.json")
+
+
+def export_pages(
+    api_path: str,
+    site_param: str,
+    fields: str | None,
+    output_dir: str,
+    pages: list[tuple[int, str]],
+) -> list[tuple[int, int]]:
+    """
+    Render the API detail response of each (page id, site relative path) into output_dir.
+    Returns (page id, response status) pairs.
+    """
+    factory = RequestFactory()
+    params = {"site": site_param}
+    if fields:
+        params["fields"] = fields
+    statuses = []
+    for pk, path in pages:
+        url = f"{api_path}{pk}/"
+        match = resolve(url)
+        response = match.func(factory.get(url, params), *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        if response.status_code == 200:
+            page_file = get_page_file(output_dir, path)
+            page_file.parent.mkdir(parents=True, exist_ok=True)
+            page_file.write_bytes(response.content)
+        statuses.append((pk, response.status_code))
+    return statuses
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the pages API detail response of every live page of a site to "
+        "<output>/<url path>/index.json, rendered in parallel worker processes"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("output", help="Directory to write the page files to")
+        parser.add_argument(
+            "--site",
+            help="Site hostname or hostname:port, defaults to the default site",
+        )
+        parser.add_argument(
+            "--api-path",
+            default="/api/v2/pages/",
+            help="URL of the pages endpoint listing, used to route detail requests",
+        )
+        parser.add_argument("--fields", help="fields query parameter to export with")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1, help="Worker processes"
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only export pages published, moved or renamed since the last export "
+                "to output, and remove files of pages that are no longer live"
+            ),
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        site = self.get_site(options["site"])
+        output_dir = options["output"]
+        manifest_file = Path(output_dir, MANIFEST_NAME)
+        site_param = f"{site.hostname}:{site.port}"
+
+        root_path = site.root_page.url_path
+        current = {
+            str(pk): {"path": "/" + url_path[len(root_path) :], "revision": revision}
+            for pk, url_path, revision in Page.objects.live()
+            .public()
+            .descendant_of(site.root_page, inclusive=True)
+            .values_list("pk", "url_path", "live_revision_id")
+            .iterator()
+        }
+
+        previous: dict[str, dict[str, Any]] = {}
+        if options["incremental"] and manifest_file.exists():
+            manifest = json.loads(manifest_file.read_text())
+            if (
+                manifest["site"] != site_param
+                or manifest["fields"] != options["fields"]
+            ):
+                raise CommandError(
+                    f"{output_dir} holds an export of another site or fields, "
+                    "run without --incremental"
+                )
+            previous = manifest["pages"]
+
+        changed = [
+            (int(pk), page["path"])
+            for pk, page in current.items()
+            if previous.get(pk) != page
+        ]
+        for pk, page in previous.items():
+            if pk not in current or current[pk]["path"] != page["path"]:
+                get_page_file(output_dir, page["path"]).unlink(missing_ok=True)
+
+        statuses = self.export(changed, site_param, output_dir, options)
+        failed = {str(pk) for pk, status in statuses if status != 200}
+        for pk in sorted(failed, key=int):
+            self.stderr.write(f"Page {pk} ({current[pk]['path']}) was not exported")
+
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        manifest_file.write_text(
+            json.dumps(
+                {
+                    "site": site_param,
+                    "fields": options["fields"],
+                    "pages": {
+                        pk: page for pk, page in current.items() if pk not in failed
+                    },
+                }
+            )
+        )
+        self.stdout.write(
+            f"Exported {len(changed) - len(failed)} of {len(current)} pages to {output_dir}"
+        )
+
+    def get_site(self, hostname: str | None) -> Site:
+        if hostname is None:
+            return Site.objects.select_related("root_page").get(is_default_site=True)
+        sites = find_sites(hostname)
+        if len(sites) != 1:
+            raise CommandError(f"Site {hostname} not found, try adding a port")
+        return sites[0]
+
+    def export(
+        self,
+        pages: list[tuple[int, str]],
+        site_param: str,
+        output_dir: str,
+        options: dict[str, Any],
+    ) -> list[tuple[int, int]]:
+        args = (options["api_path"], site_param, options["fields"], output_dir)
+        workers = min(options["workers"], len(pages))
+        if workers <= 1:
+            return export_pages(*args, pages)
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        chunk_size = max(len(pages) // (workers * 4), 1)
+        chunks = [
+            pages[start : start + chunk_size]
+            for start in range(0, len(pages), chunk_size)
+        ]
+        statuses = []
+        with ProcessPoolExecutor(workers, initializer=init_worker) as executor:
+            futures = [executor.submit(export_pages, *args, chunk) for chunk in chunks]
+            for future in futures:
+                statuses += future.result()
+        return statuses
@@ -0,0 +1,15 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from ...indexes import rebuild_draft_slug_index, rebuild_page_path_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the lookup indexes used by the SPA pages API"
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = rebuild_page_path_index()
+        self.stdout.write(f"Indexed {count} page paths")
+        count = rebuild_draft_slug_index()
+        self.stdout.write(f"Indexed {count} draft slugs")
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:11
+
+from typing import ClassVar
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies: ClassVar = [
+        ("wagtailcore", "0094_alter_page_locale"),
+    ]
+
+    operations: ClassVar = [
+        migrations.CreateModel(
+            name="PagePathIndex",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=255)),
+                ("url_path", models.TextField()),
+                (
+                    "page",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="spa_path_index",
+                        to="wagtailcore.page",
+                    ),
+                ),
+                (
+                    "site",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="wagtailcore.site",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("site", "path")},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:13
+
+from typing import Any, ClassVar
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_draft_slug_index(apps: Any, schema_editor: Any) -> None:
+    Page = apps.get_model("wagtailcore", "Page")
+    DraftSlugIndex = apps.get_model("wagtail_spa_integration", "DraftSlugIndex")
+    entries = [
+        DraftSlugIndex(page_id=page_id, slug=content["slug"])
+        for page_id, content in Page.objects.filter(latest_revision__isnull=False)
+        .values_list("pk", "latest_revision__content")
+        .iterator()
+        if content.get("slug")
+    ]
+    DraftSlugIndex.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [
+        ("wagtail_spa_integration", "0001_initial"),
+        ("wagtailcore", "0094_alter_page_locale"),
+    ]
+
+    operations: ClassVar = [
+        migrations.CreateModel(
+            name="DraftSlugIndex",
+            fields=[
+                (
+                    "page",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="spa_draft_slug",
+                        serialize=False,
+                        to="wagtailcore.page",
+                    ),
+                ),
+                ("slug", models.SlugField(allow_unicode=True, max_length=255)),
+            ],
+        ),
+        migrations.RunPython(
+            populate_draft_slug_index, migrations.RunPython.noop, elidable=True
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+from typing import ClassVar
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar = [
+        ("wagtail_spa_integration", "0002_draftslugindex"),
+    ]
+
+    operations: ClassVar = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("publish", "Publish"),
+                            ("unpublish", "Unpublish"),
+                            ("move", "Move"),
+                            ("delete", "Delete"),
+                            ("redirect_save", "Redirect Save"),
+                            ("redirect_delete", "Redirect Delete"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("page_id", models.IntegerField(null=True)),
+                ("site_id", models.IntegerField(null=True)),
+                ("old_path", models.TextField(blank=True)),
+                ("new_path", models.TextField(blank=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from wagtail.models import Page, Site
+
+if not apps.is_installed("wagtail_spa_integration"):
+    # Versions without models could be used without installing the app
+    raise ImproperlyConfigured(
+        "wagtail_spa_integration must be in INSTALLED_APPS, "
+        "run ./manage.py migrate after adding it"
+    )
+
+PATH_MAX_LENGTH = 255
+
+
+class PagePathIndex(models.Model):
+    """
+    Maps a site relative html path (as sent to `detail_by_path`) to the live page it resolves to.
+
+    `url_path` is the page url_path at the time the entry was written. Entries whose `url_path`
+    no longer matches the page are stale and ignored, so the index never needs to be exact.
+    """
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name="+")
+    path = models.CharField(max_length=PATH_MAX_LENGTH)
+    url_path = models.TextField()
+    page = models.ForeignKey(
+        Page, on_delete=models.CASCADE, related_name="spa_path_index"
+    )
+
+    class Meta:
+        unique_together = ("site", "path")
+
+    def __str__(self) -> str:
+        return f"{self.site_id}:{self.path} -> {self.page_id}"
+
+
+class DraftSlugIndex(models.Model):
+    """
+    Slug of the latest revision of each page. Lets draft paths be routed without
+    searching revision content.
+    """
+
+    page = models.OneToOneField(
+        Page, on_delete=models.CASCADE, primary_key=True, related_name="spa_draft_slug"
+    )
+    slug = models.SlugField(max_length=255, allow_unicode=True)
+
+    def __str__(self) -> str:
+        return f"{self.page_id}: {self.slug}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Append-only record of a change to what a site serves at a path. Entries are written
+    per site serving the page, `old_path` and `new_path` are site relative html paths.
+
+    A `move` entry also changes the path of every page below `old_path`. Redirect entries
+    hold the redirect's old_path and the page it redirects to, if any. Redirects without
+    a site apply to every site and have no `site`.
+    """
+
+    class Action(models.TextChoices):
+        PUBLISH = "publish"
+        UNPUBLISH = "unpublish"
+        MOVE = "move"
+        DELETE = "delete"
+        REDIRECT_SAVE = "redirect_save"
+        REDIRECT_DELETE = "redirect_delete"
+
+    id = models.BigAutoField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    action = models.CharField(max_length=20, choices=Action.choices)
+    # Not a foreign key, entries outlive the pages and sites they refer to
+    page_id = models.IntegerField(null=True)
+    site_id = models.IntegerField(null=True)
+    old_path = models.TextField(blank=True)
+    new_path = models.TextField(blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.pk} {self.action} {self.old_path} -> {self.new_path}"
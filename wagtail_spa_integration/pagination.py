@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.request import Request
+from rest_framework.response import Response
+from wagtail.api.v2.pagination import WagtailPagination
+from wagtail.api.v2.utils import BadRequestError
+from wagtail.models import PageQuerySet
+
+# Orderings supported in cursor mode, each is unique together with the page id
+CURSOR_ORDER_FIELDS = ("path", "id", "first_published_at")
+
+
+def encode_cursor(value: Any, pk: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+
+def decode_cursor(cursor: str, field: str) -> tuple[Any, int]:
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequestError("cursor is invalid")
+    if not isinstance(pk, int):
+        raise BadRequestError("cursor is invalid")
+    if field == "first_published_at" and value is not None:
+        value = parse_datetime(value) if isinstance(value, str) else None
+        if value is None:
+            raise BadRequestError("cursor is invalid")
+    return value, pk
+
+
+class SPAPagination(WagtailPagination):
+    """
+    Wagtail's offset pagination, plus keyset pagination when the `cursor` query
+    parameter is given (empty for the first page). Cursor pages don't slow down the
+    further they are and don't shift when pages are published before them.
+
+    Cursor mode supports ordering by `path` (the default), `id` and
+    `first_published_at`, optionally reversed. Instead of `total_count` the response
+    meta has `next_cursor`, which is null on the last page.
+    """
+
+    cursor_mode = False
+    next_cursor: str | None = None
+
+    def paginate_queryset(
+        self, queryset: PageQuerySet, request: Request, view: Any = None
+    ) -> Any:
+        if "cursor" not in request.GET:
+            return super().paginate_queryset(queryset, request, view)
+        if "offset" in request.GET:
+            raise BadRequestError("cursor and offset cannot be combined")
+        if "search" in request.GET:
+            raise BadRequestError("cursor pagination is not supported with search")
+
+        field, descending = self.get_cursor_ordering(request)
+        limit = self.get_limit(request)
+        queryset = self.order_queryset(queryset, field, descending)
+        if request.GET["cursor"]:
+            value, pk = decode_cursor(request.GET["cursor"], field)
+            queryset = queryset.filter(
+                self.get_after_cursor_filter(field, descending, value, pk)
+            )
+
+        self.cursor_mode = True
+        self.next_cursor = None
+        items = list(queryset[: limit + 1])
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            self.next_cursor = encode_cursor(getattr(last, field), last.pk)
+        return items
+
+    def get_cursor_ordering(self, request: Request) -> tuple[str, bool]:
+        order = request.GET.get("order", "path")
+        field = order.removeprefix("-")
+        if field not in CURSOR_ORDER_FIELDS:
+            raise BadRequestError(
+                "cursor pagination only supports ordering by "
+                + ", ".join(CURSOR_ORDER_FIELDS)
+            )
+        return field, order.startswith("-")
+
+    def get_limit(self, request: Request) -> int:
+        limit_max = getattr(settings, "WAGTAILAPI_LIMIT_MAX", 20)
+        try:
+            limit_default = 20 if not limit_max else min(20, limit_max)
+            limit = int(request.GET.get("limit", limit_default))
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            raise BadRequestError("limit must be a positive integer")
+        if limit_max and limit > limit_max:
+            raise BadRequestError(f"limit cannot be higher than {limit_max}")
+        return limit
+
+    def order_queryset(
+        self, queryset: PageQuerySet, field: str, descending: bool
+    ) -> PageQuerySet:
+        if not queryset.query.standard_ordering:
+            # Undo the reverse() wagtail's OrderingFilter applies for `-field` on
+            # viewsets that don't use SPAOrderingFilter
+            queryset = queryset.reverse()
+        if field == "id":
+            return queryset.order_by("-id" if descending else "id")
+        if descending:
+            return queryset.order_by(F(field).desc(nulls_last=True), "-id")
+        return queryset.order_by(F(field).asc(nulls_last=True), "id")
+
+    def get_after_cursor_filter(
+        self, field: str, descending: bool, value: Any, pk: int
+    ) -> Q:
+        """Rows after (value, pk) in the ordering, pages without a value sort last"""
+        lookup = "lt" if descending else "gt"
+        if field == "id":
+            return Q(**{f"id__{lookup}": pk})
+        if value is None:
+            return Q(**{f"{field}__isnull": True, f"id__{lookup}": pk})
+        return (
+            Q(**{f"{field}__{lookup}": value})
+            | Q(**{field: value, f"id__{lookup}": pk})
+            | Q(**{f"{field}__isnull": True})
+        )
+
+    def get_paginated_response(self, data: Any) -> Response:
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)  # type: ignore[no-any-return]
+        return Response(
+            OrderedDict(
+                [
+                    ("meta", OrderedDict([("next_cursor", self.next_cursor)])),
+                    ("items", data),
+                ]
+            )
+        )
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+import threading
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from wagtail.models import PageQuerySet
+
+# Plans kept per process, the fields parameter comes from clients so the number is capped
+PREFETCH_PLAN_CACHE_SIZE = 256
+
+_prefetch_plans: "OrderedDict[tuple[str, str], PrefetchPlan]" = OrderedDict()
+_prefetch_plans_lock = threading.Lock()
+
+
+@dataclass
+class PrefetchPlan:
+    select_related: list[str] = field(default_factory=list)
+    prefetch_related: list[str] = field(default_factory=list)
+
+    def apply(self, queryset: PageQuerySet) -> PageQuerySet:
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+
+def get_prefetch_plan(
+    model: type[models.Model], fields: str, get_serializer_class: Callable[[], Any]
+) -> PrefetchPlan:
+    """
+    Related objects to load along with a listing of model, planned from the serializer
+    class the listing uses and memoized per model and `fields` query parameter
+    """
+    key = (model._meta.label_lower, fields)
+    with _prefetch_plans_lock:
+        plan = _prefetch_plans.get(key)
+        if plan is not None:
+            _prefetch_plans.move_to_end(key)
+            return plan
+
+    plan = PrefetchPlan()
+    plan_serializer(plan, model, get_serializer_class(), "", True)
+    with _prefetch_plans_lock:
+        _prefetch_plans[key] = plan
+        while len(_prefetch_plans) > PREFETCH_PLAN_CACHE_SIZE:
+            _prefetch_plans.popitem(last=False)
+    return plan
+
+
+def plan_serializer(
+    plan: PrefetchPlan,
+    model: type[models.Model],
+    serializer_class: Any,
+    prefix: str,
+    can_select: bool,
+) -> None:
+    """
+    Add the relations serializer_class reads to plan. Forward foreign keys are joined
+    with select_related while every relation up to them is one, all others (child
+    relations, reverse and many to many relations) are prefetched.
+    """
+    declared_fields = getattr(serializer_class, "_declared_fields", {})
+    child_serializer_classes = getattr(serializer_class, "child_serializer_classes", {})
+    for field_name in serializer_class.Meta.fields:
+        declared = declared_fields.get(field_name)
+        source = getattr(declared, "source", None) or field_name
+        if source == "*" or "." in source:
+            continue
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation or model_field.related_model is None:
+            continue
+
+        lookup = prefix + source
+        single = bool(
+            (model_field.many_to_one or model_field.one_to_one)
+            and not model_field.auto_created
+        )
+        if single and can_select:
+            plan.select_related.append(lookup)
+        else:
+            plan.prefetch_related.append(lookup)
+
+        child_serializer_class = child_serializer_classes.get(field_name)
+        if child_serializer_class is not None:
+            plan_serializer(
+                plan,
+                model_field.related_model,
+                child_serializer_class,
+                lookup + "__",
+                single and can_select,
+            )
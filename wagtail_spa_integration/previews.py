@@ -0,0 +1,57 @@
+from collections import OrderedDict
+import copy
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from wagtail.models import Page
+from wagtail_headless_preview.models import PagePreview
+
+from .cache import get_version
+
+# (content type id, token) -> (preview version, page)
+_preview_pages: "OrderedDict[tuple[int, str], tuple[str, Page]]" = OrderedDict()
+_preview_pages_lock = threading.Lock()
+
+
+def preview_version_name(token: str) -> str:
+    return "preview:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_preview_content_type(content_type: str) -> ContentType:
+    """ContentType for an `app_label.model` string, from the ContentType cache"""
+    app_label, model = content_type.split(".")
+    return ContentType.objects.get_by_natural_key(app_label, model)
+
+
+def get_preview_page(content_type: ContentType, token: str) -> Page:
+    """
+    Deserialized page of a PagePreview.
+
+    Pages are memoized in process for as long as their preview is unchanged, the preview
+    version is bumped whenever a PagePreview is saved or deleted. At most
+    SPA_PREVIEW_CACHE_SIZE (default 100) pages are kept. Every call returns its own copy
+    of the page, memoized pages are shared between threads.
+
+    Raises PagePreview.DoesNotExist.
+    """
+    key = (content_type.pk, token)
+    version = get_version(preview_version_name(token))
+    with _preview_pages_lock:
+        memoized = _preview_pages.get(key)
+        if memoized is not None and memoized[0] == version:
+            _preview_pages.move_to_end(key)
+            return copy.deepcopy(memoized[1])
+
+    page = PagePreview.objects.get(content_type=content_type, token=token).as_page()
+    if not page.pk:
+        # fake primary key to stop API URL routing from complaining
+        page.pk = 0
+
+    with _preview_pages_lock:
+        _preview_pages[key] = (version, copy.deepcopy(page))
+        _preview_pages.move_to_end(key)
+        while len(_preview_pages) > getattr(settings, "SPA_PREVIEW_CACHE_SIZE", 100):
+            _preview_pages.popitem(last=False)
+    return page
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlparse
+import gzip
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.encoding import uri_to_iri
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Site
+
+from .cache import KEY_PREFIX, aget_version, get_cache, get_version
+from .serializers import RedirectSerializer
+from .utils import hash_etag
+
+REDIRECTS_VERSION = "redirects"
+
+# Process local redirect maps, site pk -> (version, normalised old_path -> redirect)
+_redirect_maps: dict[int | None, tuple[str, dict[str, dict[str, Any]]]] = {}
+
+
+@dataclass
+class RedirectSnapshot:
+    etag: str
+    content: bytes
+    gzipped_content: bytes
+
+
+def get_redirects_version() -> str:
+    return get_version(REDIRECTS_VERSION)
+
+
+def get_redirect_snapshot_etag(
+    site: Site | None, version: str, content_encoding: str | None = None
+) -> str:
+    """ETag of a snapshot, each content encoding of it is a different representation"""
+    if content_encoding:
+        return hash_etag(REDIRECTS_VERSION, version, site and site.pk, content_encoding)
+    return hash_etag(REDIRECTS_VERSION, version, site and site.pk)
+
+
+def get_redirect_snapshot(site: Site | None, version: str) -> RedirectSnapshot:
+    """
+    Pre-serialized JSON of every redirect that applies to site (site specific and
+    site-less redirects), or of all redirects when site is None.
+
+    Snapshots are cached until a redirect changes.
+    """
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:redirect_snapshot:{site and site.pk}:{version}"
+    snapshot: RedirectSnapshot | None = cache.get(key)
+    if snapshot is None:
+        snapshot = build_redirect_snapshot(site, version)
+        cache.set(key, snapshot, None)
+    return snapshot
+
+
+def build_redirect_snapshot(site: Site | None, version: str) -> RedirectSnapshot:
+    redirects = Redirect.objects.select_related("site", "redirect_page").order_by("pk")
+    if site is not None:
+        redirects = redirects.filter(Q(site=site) | Q(site__isnull=True))
+    data = {
+        "version": version,
+        "site": site.hostname if site else None,
+        "redirects": RedirectSerializer(redirects, many=True).data,
+    }
+    content = json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+    return RedirectSnapshot(
+        etag=get_redirect_snapshot_etag(site, version),
+        content=content,
+        gzipped_content=gzip.compress(content, mtime=0),
+    )
+
+
+def get_redirect_map(site: Site | None, version: str) -> dict[str, dict[str, Any]]:
+    """
+    Normalised old_path -> serialized redirect for site, built from the redirect snapshot
+    and kept in process until the redirects version changes.
+    Site specific redirects take precedence over redirects without a site. Without a
+    site only redirects without a site apply, as with Redirect.get_for_site(None).
+    """
+    site_pk = site and site.pk
+    cached = _redirect_maps.get(site_pk)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    snapshot = get_redirect_snapshot(site, version)
+    redirect_map: dict[str, dict[str, Any]] = {}
+    for redirect in json.loads(snapshot.content)["redirects"]:
+        old_path = Redirect.normalise_path(redirect["old_path"])
+        if site is None and redirect["site"] is not None:
+            continue
+        if redirect["site"] is None:
+            redirect_map.setdefault(old_path, redirect)
+        else:
+            redirect_map[old_path] = redirect
+    _redirect_maps[site_pk] = (version, redirect_map)
+    return redirect_map
+
+
+def resolve_redirect(site: Site | None, path: str) -> dict[str, Any] | None:
+    """
+    Find the redirect for path the same way wagtail's RedirectMiddleware does: the
+    normalised path first, then the path without its query string.
+    """
+    redirect_map = get_redirect_map(site, get_redirects_version())
+    return match_redirect(redirect_map, path)
+
+
+async def aresolve_redirect(site: Site | None, path: str) -> dict[str, Any] | None:
+    """Async version of resolve_redirect()"""
+    version = await aget_version(REDIRECTS_VERSION)
+    cached = _redirect_maps.get(site and site.pk)
+    if cached is not None and cached[0] == version:
+        redirect_map = cached[1]
+    else:
+        redirect_map = await sync_to_async(get_redirect_map)(site, version)
+    return match_redirect(redirect_map, path)
+
+
+def match_redirect(
+    redirect_map: dict[str, dict[str, Any]], path: str
+) -> dict[str, Any] | None:
+    path = Redirect.normalise_path(path)
+    path_without_query = urlparse(path).path
+    for candidate in (path, uri_to_iri(path), path_without_query):
+        redirect = redirect_map.get(candidate)
+        if redirect is not None:
+            return redirect
+    return None
@@ -0,0 +1,119 @@
+from collections.abc import Mapping
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer using orjson, producing the same bytes as DRF's JSONRenderer. Values orjson
+    would format differently (datetimes, decimals, lazy strings...) are passed to DRF's
+    JSON encoder. Falls back to JSONRenderer for indented output and when DRF is set up
+    for ASCII only or non compact JSON.
+    """
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        if orjson is None:
+            raise ImproperlyConfigured("ORJSONRenderer requires the orjson package")
+        if (
+            data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type or "", renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Same javascript safe escaping as JSONRenderer
+        return content.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack encoding of the data JSONRenderer renders, values JSON has no type for are
+    encoded the same way as in JSON (e.g. datetimes as ISO 8601 strings)
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        if msgpack is None:
+            raise ImproperlyConfigured(
+                "MessagePackRenderer requires the msgpack package"
+            )
+        if data is None:
+            return b""
+        return msgpack.packb(  # type: ignore[no-any-return]
+            data, default=JSONRenderer.encoder_class().default, use_bin_type=True
+        )
+
+
+def get_api_renderer_classes() -> list[type[BaseRenderer]] | None:
+    """
+    Renderer classes configured with SPA_API_RENDERERS as dotted paths, e.g.
+
+        SPA_API_RENDERERS = [
+            "wagtail_spa_integration.renderers.ORJSONRenderer",
+            "wagtail_spa_integration.renderers.MessagePackRenderer",
+            "rest_framework.renderers.BrowsableAPIRenderer",
+        ]
+
+    None when the endpoints should keep their own renderers.
+    """
+    paths = getattr(settings, "SPA_API_RENDERERS", None)
+    if not paths:
+        return None
+    return [import_string(path) for path in paths]
+
+
+class ConfigurableRenderersMixin:
+    """Renders responses of a DRF view with the SPA_API_RENDERERS, when set"""
+
+    def get_renderers(self) -> list[BaseRenderer]:
+        renderer_classes = get_api_renderer_classes()
+        if renderer_classes is None:
+            return super().get_renderers()  # type: ignore[misc,no-any-return]
+        return [renderer_class() for renderer_class in renderer_classes]
+
+    def finalize_response(
+        self, request: Request, response: Response, *args: Any, **kwargs: Any
+    ) -> Response:
+        response = super().finalize_response(request, response, *args, **kwargs)  # type: ignore[misc]
+        if get_api_renderer_classes() is not None:
+            # Caches must keep the response of each negotiated format apart
+            patch_vary_headers(response, ["Accept"])
+        return response
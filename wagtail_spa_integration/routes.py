@@ -0,0 +1,165 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from wagtail.models import Site
+
+from .cache import KEY_PREFIX, bump_versions, get_cache, get_version
+from .indexes import get_site_paths
+
+
+@dataclass
+class RouteManifest:
+    """
+    Route table of a site in columnar form: row n is the page ids[n] served at paths[n],
+    of the page type types[type_indexes[n]].
+    """
+
+    version: str
+    types: list[str]
+    ids: list[int]
+    paths: list[str]
+    type_indexes: list[int]
+    content: bytes
+
+    def get_routes(self) -> dict[int, tuple[str, str]]:
+        """Page id -> (path, page type)"""
+        return {
+            pk: (path, self.types[type_index])
+            for pk, path, type_index in zip(self.ids, self.paths, self.type_indexes)
+        }
+
+
+def routes_version_name(site_id: int) -> str:
+    return f"routes:{site_id}"
+
+
+def get_route_manifest_timeout() -> int | None:
+    """
+    How long manifests are kept, also how long clients can fetch a delta from an older
+    version before they get the full manifest instead
+    """
+    return getattr(settings, "SPA_ROUTE_MANIFEST_TIMEOUT", 86400)
+
+
+def get_route_manifest_key(site_id: int, version: str) -> str:
+    return f"{KEY_PREFIX}:routes:{site_id}:manifest:{version}"
+
+
+def get_route_manifest(site: Site) -> RouteManifest:
+    """
+    Route manifest of site. Manifests are stored under the hash of their routes, so
+    rebuilding after a change that didn't affect any route keeps the version clients have.
+    """
+    cache = get_cache()
+    cache_version = get_version(routes_version_name(site.pk))
+    version_key = f"{KEY_PREFIX}:routes:{site.pk}:{cache_version}"
+    version: str | None = cache.get(version_key)
+    if version is not None:
+        manifest: RouteManifest | None = cache.get(
+            get_route_manifest_key(site.pk, version)
+        )
+        if manifest is not None:
+            return manifest
+
+    manifest = build_route_manifest(site)
+    cache.set_many(
+        {
+            version_key: manifest.version,
+            get_route_manifest_key(site.pk, manifest.version): manifest,
+        },
+        get_route_manifest_timeout(),
+    )
+    return manifest
+
+
+def get_older_route_manifest(site: Site, version: str) -> RouteManifest | None:
+    """A previously served manifest of site, None once it expired"""
+    return get_cache().get(get_route_manifest_key(site.pk, version))  # type: ignore[no-any-return]
+
+
+def build_route_manifest(site: Site) -> RouteManifest:
+    root_path = site.root_page.url_path
+    type_names: dict[int, str] = {}
+    type_indexes_by_content_type: dict[int, int] = {}
+    ids: list[int] = []
+    paths: list[str] = []
+    type_indexes: list[int] = []
+    rows = (
+        site.root_page.get_descendants(inclusive=True)
+        .live()
+        .public()
+        .order_by("path")
+        .values_list("pk", "url_path", "content_type_id")
+    )
+    for pk, url_path, content_type_id in rows.iterator():
+        if content_type_id not in type_indexes_by_content_type:
+            type_indexes_by_content_type[content_type_id] = len(type_names)
+            type_names[content_type_id] = get_page_type(content_type_id)
+        ids.append(pk)
+        paths.append("/" + url_path[len(root_path) :])
+        type_indexes.append(type_indexes_by_content_type[content_type_id])
+    types = list(type_names.values())
+
+    columns = {"types": types, "ids": ids, "paths": paths, "type_indexes": type_indexes}
+    version = hashlib.sha256(
+        json.dumps(columns, separators=(",", ":")).encode()
+    ).hexdigest()[:32]
+    content = json.dumps(
+        {"version": version, "site": site.hostname, "full": True, **columns},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+    return RouteManifest(version, types, ids, paths, type_indexes, content)
+
+
+def get_page_type(content_type_id: int) -> str:
+    """`app_label.ModelName` of a page content type, as the pages API `type` field"""
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    if model is None:
+        return ""
+    return f"{model._meta.app_label}.{model.__name__}"
+
+
+def get_route_manifest_delta(
+    manifest: RouteManifest, since: RouteManifest
+) -> dict[str, Any]:
+    """Routes added or changed and page ids removed between since and manifest"""
+    old_routes = since.get_routes()
+    types: list[str] = []
+    type_indexes_by_name: dict[str, int] = {}
+    ids: list[int] = []
+    paths: list[str] = []
+    type_indexes: list[int] = []
+    for pk, route in manifest.get_routes().items():
+        if old_routes.pop(pk, None) == route:
+            continue
+        path, page_type = route
+        if page_type not in type_indexes_by_name:
+            type_indexes_by_name[page_type] = len(types)
+            types.append(page_type)
+        ids.append(pk)
+        paths.append(path)
+        type_indexes.append(type_indexes_by_name[page_type])
+    return {
+        "version": manifest.version,
+        "since": since.version,
+        "full": False,
+        "types": types,
+        "ids": ids,
+        "paths": paths,
+        "type_indexes": type_indexes,
+        "removed": sorted(old_routes),
+    }
+
+
+def invalidate_route_manifests(url_paths: Iterable[str]) -> None:
+    """Rebuild the route manifests of every site serving any of url_paths"""
+    site_ids = {
+        site_id for url_path in url_paths for site_id in get_site_paths(url_path)
+    }
+    bump_versions(routes_version_name(site_id) for site_id in site_ids)
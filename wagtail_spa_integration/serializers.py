@@ -2,6 +2,8 @@ from rest_framework import serializers
 from wagtail.contrib.redirects.models import Redirect
 from wagtail.models import Site
 
+from .models import ChangeLogEntry
+
 
 class RedirectSerializer(serializers.ModelSerializer[Redirect]):
     site: Site = serializers.SlugRelatedField(slug_field="hostname", read_only=True)
@@ -9,3 +11,25 @@ class RedirectSerializer(serializers.ModelSerializer[Redirect]):
     class Meta:
         model = Redirect
         fields = ("old_path", "is_permanent", "site", "link")
+
+
+class ChangeLogEntrySerializer(serializers.ModelSerializer[ChangeLogEntry]):
+    site = serializers.SerializerMethodField()
+
+    def get_site(self, obj: ChangeLogEntry) -> str | None:
+        """Hostname of the site, looked up in the site_hostnames context"""
+        hostnames: dict[int, str] = self.context["site_hostnames"]
+        return hostnames.get(obj.site_id) if obj.site_id is not None else None
+
+    class Meta:
+        model = ChangeLogEntry
+        fields = (
+            "id",
+            "created_at",
+            "action",
+            "page_id",
+            "site_id",
+            "site",
+            "old_path",
+            "new_path",
+        )
@@ -0,0 +1,316 @@
+from typing import Any
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Page, PageViewRestriction, Revision, Site
+from wagtail.models.content_types import get_default_page_content_type
+from wagtail.signals import (
+    page_published,
+    page_slug_changed,
+    page_unpublished,
+    post_page_move,
+)
+from wagtail_headless_preview.models import PagePreview
+
+from .brokers import get_preview_broker, preview_channel
+from .cache import PAGES_VERSION, bump_version, bump_versions, page_version_name
+from .changes import log_page_change, log_redirect_change
+from .indexes import index_revision_slug, refresh_page_path_index
+from .models import ChangeLogEntry, PagePathIndex
+from .previews import preview_version_name
+from .redirects import REDIRECTS_VERSION
+from .routes import invalidate_route_manifests, routes_version_name
+from .sitemaps import invalidate_sitemap_page, invalidate_sitemaps, sitemap_version_name
+from .sites import clear_site_index
+from .surrogate_keys import (
+    PAGES_KEY,
+    REDIRECTS_KEY,
+    get_page_purge_keys,
+    purge_surrogate_keys,
+    site_key,
+)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+def update_page_path_index(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    refresh_page_path_index(instance)
+
+
+@receiver(post_save, sender=Site)
+def clear_site_page_path_index(
+    sender: type[Site], instance: Site, **kwargs: Any
+) -> None:
+    # The root page or hostname may have changed, entries are rebuilt on demand
+    PagePathIndex.objects.filter(site=instance).delete()
+
+
+@receiver(post_save, sender=Revision)
+def update_draft_slug_index(
+    sender: type[Revision], instance: Revision, created: bool, **kwargs: Any
+) -> None:
+    if created and instance.base_content_type_id == get_default_page_content_type().pk:
+        index_revision_slug(instance)
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+@receiver(page_slug_changed)
+@receiver(post_page_move)
+def update_site_index(sender: type[Site | Page], **kwargs: Any) -> None:
+    # The site index holds root pages, whose url_path changes with their slug or position.
+    # Cleared once committed, or concurrent requests could index the old rows again.
+    transaction.on_commit(clear_site_index)
+
+
+@receiver(post_save, sender=Redirect)
+@receiver(post_delete, sender=Redirect)
+@receiver(page_slug_changed)
+@receiver(post_page_move)
+def update_redirects_version(sender: type[Redirect | Page], **kwargs: Any) -> None:
+    # Redirects to a page link to its url, which changes with its slug or position.
+    # Bumped once committed, or concurrent requests could store the old redirects again.
+    transaction.on_commit(lambda: bump_version(REDIRECTS_VERSION))
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+@receiver(page_slug_changed)
+def invalidate_page_responses(
+    sender: type[Page], instance: Page, **kwargs: Any
+) -> None:
+    if kwargs.get("url_path_before") or kwargs.get("instance_before"):
+        # Moved or renamed, the url of every descendant changed too
+        pages = instance.get_descendants(inclusive=True)
+    else:
+        # Children show the title of their parent
+        pages = Page.objects.filter(pk=instance.pk) | instance.get_children()
+    names = [page_version_name(pk) for pk in pages.values_list("pk", flat=True)]
+    # Bumped once committed, or concurrent requests could cache the old page again
+    transaction.on_commit(lambda: bump_versions([*names, PAGES_VERSION]))
+
+
+@receiver(post_delete, sender=Page)
+def invalidate_deleted_page_responses(
+    sender: type[Page], instance: Page, **kwargs: Any
+) -> None:
+    names = [page_version_name(instance.pk), PAGES_VERSION]
+    transaction.on_commit(lambda: bump_versions(names))
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_delete, sender=Page)
+def update_sitemap_chunk(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    # Once committed, or concurrent requests could store the old chunk again
+    transaction.on_commit(lambda: invalidate_sitemap_page(instance))
+
+
+@receiver(post_page_move)
+def update_moved_page_sitemaps(
+    sender: type[Page],
+    instance: Page,
+    url_path_before: str,
+    url_path_after: str,
+    **kwargs: Any,
+) -> None:
+    transaction.on_commit(
+        lambda: invalidate_sitemaps([url_path_before, url_path_after])
+    )
+
+
+@receiver(page_slug_changed)
+def update_renamed_page_sitemaps(
+    sender: type[Page], instance: Page, **kwargs: Any
+) -> None:
+    # Urls of every descendant changed
+    url_path = instance.url_path
+    transaction.on_commit(lambda: invalidate_sitemaps([url_path]))
+
+
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def update_restricted_page_sitemaps(
+    sender: type[PageViewRestriction], instance: PageViewRestriction, **kwargs: Any
+) -> None:
+    url_path = instance.page.url_path
+    transaction.on_commit(lambda: invalidate_sitemaps([url_path]))
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def update_site_sitemap(sender: type[Site], instance: Site, **kwargs: Any) -> None:
+    name = sitemap_version_name(instance.pk)
+    transaction.on_commit(lambda: bump_version(name))
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(page_slug_changed)
+@receiver(post_delete, sender=Page)
+def update_route_manifests(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    # Once committed, or concurrent requests could store the old manifest again
+    url_path = instance.url_path
+    transaction.on_commit(lambda: invalidate_route_manifests([url_path]))
+
+
+@receiver(post_page_move)
+def update_moved_page_route_manifests(
+    sender: type[Page],
+    instance: Page,
+    url_path_before: str,
+    url_path_after: str,
+    **kwargs: Any,
+) -> None:
+    transaction.on_commit(
+        lambda: invalidate_route_manifests([url_path_before, url_path_after])
+    )
+
+
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def update_restricted_page_route_manifests(
+    sender: type[PageViewRestriction], instance: PageViewRestriction, **kwargs: Any
+) -> None:
+    url_path = instance.page.url_path
+    transaction.on_commit(lambda: invalidate_route_manifests([url_path]))
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def update_site_route_manifest(
+    sender: type[Site], instance: Site, **kwargs: Any
+) -> None:
+    name = routes_version_name(instance.pk)
+    transaction.on_commit(lambda: bump_version(name))
+
+
+@receiver(post_save, sender=PagePreview)
+@receiver(post_delete, sender=PagePreview)
+def update_preview_version(
+    sender: type[PagePreview], instance: PagePreview, **kwargs: Any
+) -> None:
+    name = preview_version_name(instance.token)
+    transaction.on_commit(lambda: bump_version(name))
+
+
+@receiver(post_save, sender=PagePreview)
+def publish_preview_update(
+    sender: type[PagePreview], instance: PagePreview, **kwargs: Any
+) -> None:
+    # Once committed, or stream subscribers could read the preview before it changed
+    channel = preview_channel(instance.content_type_id, instance.token)
+    transaction.on_commit(lambda: get_preview_broker().publish(channel, "updated"))
+
+
+@receiver(page_published)
+def log_page_published(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    log_page_change(
+        ChangeLogEntry.Action.PUBLISH, instance, instance.url_path, instance.url_path
+    )
+
+
+@receiver(page_unpublished)
+def log_page_unpublished(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    log_page_change(ChangeLogEntry.Action.UNPUBLISH, instance, instance.url_path, None)
+
+
+@receiver(post_page_move)
+def log_page_moved(
+    sender: type[Page],
+    instance: Page,
+    url_path_before: str,
+    url_path_after: str,
+    **kwargs: Any,
+) -> None:
+    if instance.live:
+        log_page_change(
+            ChangeLogEntry.Action.MOVE, instance, url_path_before, url_path_after
+        )
+
+
+@receiver(page_slug_changed)
+def log_page_renamed(
+    sender: type[Page], instance: Page, instance_before: Page, **kwargs: Any
+) -> None:
+    if instance.live:
+        log_page_change(
+            ChangeLogEntry.Action.MOVE,
+            instance,
+            instance_before.url_path,
+            instance.url_path,
+        )
+
+
+@receiver(post_delete, sender=Page)
+def log_page_deleted(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    if instance.live:
+        log_page_change(ChangeLogEntry.Action.DELETE, instance, instance.url_path, None)
+
+
+@receiver(post_save, sender=Redirect)
+def log_redirect_saved(
+    sender: type[Redirect], instance: Redirect, **kwargs: Any
+) -> None:
+    log_redirect_change(ChangeLogEntry.Action.REDIRECT_SAVE, instance)
+
+
+@receiver(post_delete, sender=Redirect)
+def log_redirect_deleted(
+    sender: type[Redirect], instance: Redirect, **kwargs: Any
+) -> None:
+    log_redirect_change(ChangeLogEntry.Action.REDIRECT_DELETE, instance)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_delete, sender=Page)
+def purge_page(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    purge_surrogate_keys(get_page_purge_keys(instance, [instance.url_path]))
+
+
+@receiver(post_page_move)
+def purge_moved_page(
+    sender: type[Page],
+    instance: Page,
+    url_path_before: str,
+    url_path_after: str,
+    **kwargs: Any,
+) -> None:
+    keys = get_page_purge_keys(
+        instance, [url_path_before, url_path_after], descendants=True
+    )
+    # Redirects to the moved pages link to their url
+    purge_surrogate_keys(keys | {REDIRECTS_KEY})
+
+
+@receiver(page_slug_changed)
+def purge_renamed_page(sender: type[Page], instance: Page, **kwargs: Any) -> None:
+    keys = get_page_purge_keys(instance, [instance.url_path], descendants=True)
+    purge_surrogate_keys(keys | {REDIRECTS_KEY})
+
+
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def purge_restricted_page(
+    sender: type[PageViewRestriction], instance: PageViewRestriction, **kwargs: Any
+) -> None:
+    purge_surrogate_keys(
+        get_page_purge_keys(instance.page, [instance.page.url_path], descendants=True)
+    )
+
+
+@receiver(post_save, sender=Redirect)
+@receiver(post_delete, sender=Redirect)
+def purge_redirects(sender: type[Redirect], **kwargs: Any) -> None:
+    purge_surrogate_keys({REDIRECTS_KEY})
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def purge_site(sender: type[Site], instance: Site, **kwargs: Any) -> None:
+    purge_surrogate_keys({site_key(instance.pk), PAGES_KEY})
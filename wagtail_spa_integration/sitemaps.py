@@ -0,0 +1,294 @@
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+import hashlib
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.template.defaultfilters import date
+from django.utils.html import escape
+from django.utils.http import quote_etag
+from django.utils.timezone import is_aware, localtime
+from wagtail.models import Page, PageQuerySet, Site
+
+from .cache import KEY_PREFIX, bump_version, bump_versions, get_cache, get_version
+from .indexes import get_site_paths
+
+# Pages loaded per query while iterating a sitemap chunk
+SITEMAP_BATCH_SIZE = 500
+
+
+@dataclass
+class SitemapChunk:
+    etag: str
+    last_modified: int | None
+    content: bytes
+
+
+SITEMAP_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+    'xmlns:xhtml="http://www.w3.org/1999/xhtml">\n'
+)
+SITEMAP_INDEX_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+
+
+def get_sitemap_page_size() -> int:
+    """Maximum number of pages per sitemap, the sitemap protocol allows 50000 urls"""
+    return getattr(settings, "SPA_SITEMAP_PAGE_SIZE", 50000)
+
+
+def get_sitemap_site(request: HttpRequest) -> Site:
+    site = Site.find_for_request(request)
+    if site is None:
+        return Site.objects.select_related("root_page").get(is_default_site=True)
+    return site
+
+
+def get_sitemap_queryset(site: Site) -> PageQuerySet:
+    """Pages listed in the sitemap of site, the same pages wagtail's sitemap lists"""
+    return (
+        site.root_page.get_descendants(inclusive=True).live().public().order_by("path")
+    )
+
+
+def iter_sitemap_pages(
+    queryset: PageQuerySet,
+    start_path: str | None = None,
+    end_path: str | None = None,
+    limit: int | None = None,
+) -> Iterator[Page]:
+    """
+    Specific pages of queryset in path order, from start_path up to but excluding
+    end_path. Pages are loaded in batches keyed on path, so no query has to skip over
+    earlier pages.
+    """
+    queryset = filter_sitemap_range(
+        queryset.defer_streamfields().specific(), start_path, end_path
+    )
+    remaining = limit
+    while remaining is None or remaining > 0:
+        batch_size = SITEMAP_BATCH_SIZE
+        if remaining is not None:
+            batch_size = min(batch_size, remaining)
+            remaining -= batch_size
+        batch = list(queryset[:batch_size])
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        queryset = queryset.filter(path__gt=batch[-1].path)
+
+
+def filter_sitemap_range(
+    queryset: PageQuerySet, start_path: str | None, end_path: str | None
+) -> PageQuerySet:
+    if start_path is not None:
+        queryset = queryset.filter(path__gte=start_path)
+    if end_path is not None:
+        queryset = queryset.filter(path__lt=end_path)
+    return queryset
+
+
+def render_sitemap_url(url: dict[str, Any]) -> str:
+    """One <url> element, matching django's sitemap.xml template"""
+    xml = "  <url>\n    <loc>" + escape(url["location"]) + "</loc>\n"
+    lastmod = url.get("lastmod")
+    if lastmod:
+        if isinstance(lastmod, datetime) and is_aware(lastmod):
+            lastmod = localtime(lastmod)
+        xml += "    <lastmod>" + date(lastmod, "Y-m-d") + "</lastmod>\n"
+    if url.get("changefreq"):
+        xml += "    <changefreq>" + escape(url["changefreq"]) + "</changefreq>\n"
+    if url.get("priority"):
+        xml += "    <priority>" + escape(str(url["priority"])) + "</priority>\n"
+    for alternate in url.get("alternates") or ():
+        xml += (
+            '    <xhtml:link rel="alternate" hreflang="'
+            + escape(alternate["lang_code"])
+            + '" href="'
+            + escape(alternate["location"])
+            + '"/>\n'
+        )
+    return xml + "  </url>\n"
+
+
+def render_sitemap_index(locations: Iterable[str]) -> str:
+    return (
+        SITEMAP_INDEX_HEADER
+        + "".join(
+            "  <sitemap>\n    <loc>" + escape(location) + "</loc>\n  </sitemap>\n"
+            for location in locations
+        )
+        + "</sitemapindex>\n"
+    )
+
+
+def get_sitemap_chunk_url(request: HttpRequest, chunk: int) -> str:
+    params = request.GET.copy()
+    params["p"] = str(chunk)
+    return request.build_absolute_uri(request.path) + "?" + params.urlencode()
+
+
+def sitemap_version_name(site_id: int) -> str:
+    return f"sitemap:{site_id}"
+
+
+def get_sitemap_cache_timeout() -> int | None:
+    return getattr(settings, "SPA_SITEMAP_CACHE_TIMEOUT", 3600)
+
+
+def get_sitemap_layout_key(site_id: int, version: str) -> str:
+    return f"{KEY_PREFIX}:sitemap:{site_id}:{version}:layout"
+
+
+def get_sitemap_chunk_key(
+    site_id: int, version: str, layout: list[str], chunk: int
+) -> str:
+    end_path = layout[chunk + 1] if chunk + 1 < len(layout) else ""
+    start_path = layout[chunk] if chunk else ""
+    return f"{KEY_PREFIX}:sitemap:{site_id}:{version}:chunk:{start_path}:{end_path}"
+
+
+def get_sitemap_chunk_generation(chunk_key: str) -> str:
+    """
+    Token in the cache key a chunk is stored under, replaced when a page in the chunk
+    changes. Renders that started before the change store the old chunk under a key that
+    is no longer read.
+    """
+    cache = get_cache()
+    key = f"{chunk_key}:generation"
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid4().hex, get_sitemap_cache_timeout())
+        generation = cache.get(key)
+    return str(generation)
+
+
+def get_sitemap_layout(site: Site) -> tuple[str, list[str]]:
+    """
+    Version and chunk boundaries of the sitemap of site. Chunk n holds the pages from
+    path layout[n] up to layout[n + 1], the first chunk also holds pages before layout[0].
+
+    Chunks are laid out 90% full so pages published later fit in the chunk they sort
+    into, a chunk that overflows causes the whole sitemap to be laid out again.
+    """
+    cache = get_cache()
+    version = get_version(sitemap_version_name(site.pk))
+    key = get_sitemap_layout_key(site.pk, version)
+    layout: list[str] | None = cache.get(key)
+    if layout is None:
+        page_size = get_sitemap_page_size()
+        fill = max(page_size - page_size // 10, 1)
+        layout = [
+            path
+            for i, path in enumerate(
+                get_sitemap_queryset(site).values_list("path", flat=True).iterator()
+            )
+            if i % fill == 0
+        ]
+        cache.set(key, layout, get_sitemap_cache_timeout())
+    return version, layout
+
+
+def get_sitemap_chunk(
+    site: Site, request: HttpRequest, chunk: int
+) -> SitemapChunk | Iterator[bytes] | None:
+    """
+    Pre-rendered sitemap chunk of site. A chunk that isn't stored yet is returned as an
+    iterator of its content instead, which renders it while it is streamed and stores it
+    once complete. None when there is no such chunk.
+    """
+    cache = get_cache()
+    for limit in (get_sitemap_page_size(), None):
+        version, layout = get_sitemap_layout(site)
+        if not 0 <= chunk < max(len(layout), 1):
+            return None
+        key = get_sitemap_chunk_key(site.pk, version, layout, chunk)
+        key = f"{key}:{get_sitemap_chunk_generation(key)}"
+        sitemap_chunk: SitemapChunk | None = cache.get(key)
+        if sitemap_chunk is not None:
+            return sitemap_chunk
+        start_path = layout[chunk] if chunk else None
+        end_path = layout[chunk + 1] if chunk + 1 < len(layout) else None
+        queryset = get_sitemap_queryset(site)
+        pages = filter_sitemap_range(queryset, start_path, end_path)
+        if limit is None or not pages.values_list("pk")[limit : limit + 1]:
+            return stream_sitemap_chunk(queryset, request, start_path, end_path, key)
+        # Too many pages were published into this chunk
+        bump_version(sitemap_version_name(site.pk))
+    return None
+
+
+def stream_sitemap_chunk(
+    queryset: PageQuerySet,
+    request: HttpRequest,
+    start_path: str | None,
+    end_path: str | None,
+    key: str,
+) -> Iterator[bytes]:
+    """
+    Render a sitemap chunk while it is streamed, a batch of pages at a time. The rendered
+    content is kept and stored under key once the whole chunk was rendered, so a chunk is
+    held in memory once, but clients get its start without waiting for all of it.
+    """
+    parts: list[bytes] = []
+    last_modified: datetime | None = None
+    all_last_modified = True
+    batch = [SITEMAP_HEADER]
+    for i, page in enumerate(iter_sitemap_pages(queryset, start_path, end_path), 1):
+        for url in page.get_sitemap_urls(request):
+            batch.append(render_sitemap_url(url))
+            lastmod = url.get("lastmod")
+            if isinstance(lastmod, datetime):
+                last_modified = max(last_modified or lastmod, lastmod)
+            else:
+                all_last_modified = False
+        if i % SITEMAP_BATCH_SIZE == 0:
+            parts.append("".join(batch).encode())
+            batch = []
+            yield parts[-1]
+    batch.append("</urlset>\n")
+    parts.append("".join(batch).encode())
+    yield parts[-1]
+
+    content = b"".join(parts)
+    sitemap_chunk = SitemapChunk(
+        etag=quote_etag(hashlib.sha256(content).hexdigest()[:32]),
+        last_modified=(
+            int(last_modified.timestamp())
+            if last_modified and all_last_modified
+            else None
+        ),
+        content=content,
+    )
+    get_cache().set(key, sitemap_chunk, get_sitemap_cache_timeout())
+
+
+def invalidate_sitemap_page(page: Page) -> None:
+    """Drop the stored sitemap chunks page sorts into, in every site serving it"""
+    cache = get_cache()
+    for site_id in get_site_paths(page.url_path):
+        name = sitemap_version_name(site_id)
+        version = get_version(name)
+        layout: list[str] | None = cache.get(get_sitemap_layout_key(site_id, version))
+        if layout is None:
+            # Chunks may outlive their layout, so their page can't be looked up
+            bump_version(name)
+            continue
+        chunk = max(bisect_right(layout, page.path) - 1, 0)
+        chunk_key = get_sitemap_chunk_key(site_id, version, layout, chunk)
+        cache.set(f"{chunk_key}:generation", uuid4().hex, get_sitemap_cache_timeout())
+
+
+def invalidate_sitemaps(url_paths: Iterable[str]) -> None:
+    """Drop the stored sitemaps of every site serving any of url_paths"""
+    site_ids = {
+        site_id for url_path in url_paths for site_id in get_site_paths(url_path)
+    }
+    bump_versions(sitemap_version_name(site_id) for site_id in site_ids)
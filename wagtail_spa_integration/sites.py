@@ -0,0 +1,89 @@
+import time
+
+from django.conf import settings
+from django.db import models
+from django.http import HttpRequest
+from wagtail.models import Site
+
+# hostname -> sites with that hostname, (hostname, port) -> site
+_hostname_index: dict[str, list[Site]] = {}
+_hostname_port_index: dict[tuple[str, int], Site] = {}
+_built_at: float | None = None
+
+
+def clear_site_index() -> None:
+    global _built_at
+    _built_at = None
+
+
+def _build_site_index(sites: list[Site]) -> None:
+    global _hostname_index, _hostname_port_index, _built_at
+    hostname_index: dict[str, list[Site]] = {}
+    hostname_port_index: dict[tuple[str, int], Site] = {}
+    for site in sites:
+        hostname_index.setdefault(site.hostname, []).append(site)
+        hostname_port_index[(site.hostname, site.port)] = site
+    _hostname_index, _hostname_port_index = hostname_index, hostname_port_index
+    _built_at = time.monotonic()
+
+
+def _site_index_is_stale() -> bool:
+    timeout = getattr(settings, "SPA_SITE_INDEX_TIMEOUT", 300)
+    return _built_at is None or (
+        timeout is not None and time.monotonic() - _built_at > timeout
+    )
+
+
+def _get_site_queryset() -> models.QuerySet[Site]:
+    return Site.objects.select_related("root_page").order_by("pk")  # type: ignore[no-any-return]
+
+
+def _lookup_sites(hostname: str) -> list[Site]:
+    if hostname in _hostname_index:
+        return list(_hostname_index[hostname])
+    if ":" in hostname:
+        hostname, port = hostname.rsplit(":", 1)
+        try:
+            site = _hostname_port_index.get((hostname, int(port)))
+        except ValueError:
+            return []
+        return [site] if site else []
+    return []
+
+
+def find_sites(hostname: str) -> list[Site]:
+    """
+    Sites matching a `site` query parameter, either `hostname` or `hostname:port`.
+
+    Sites are looked up in a process local index that is rebuilt when a Site is saved or
+    deleted, and after SPA_SITE_INDEX_TIMEOUT seconds so other processes pick up changes.
+    The root page of each site is loaded.
+    """
+    if _site_index_is_stale():
+        _build_site_index(list(_get_site_queryset()))
+    return _lookup_sites(hostname)
+
+
+async def afind_sites(hostname: str) -> list[Site]:
+    """Async version of find_sites()"""
+    if _site_index_is_stale():
+        _build_site_index([site async for site in _get_site_queryset()])
+    return _lookup_sites(hostname)
+
+
+def set_request_site(request: HttpRequest) -> None:
+    """Use the site named by the `site` query parameter for this request, if there is one"""
+    hostname = request.GET.get("site", None)
+    if hostname:
+        sites = find_sites(hostname)
+        if len(sites) == 1:
+            request._wagtail_site = sites[0]  # type: ignore[attr-defined]
+
+
+async def aset_request_site(request: HttpRequest) -> None:
+    """Async version of set_request_site()"""
+    hostname = request.GET.get("site", None)
+    if hostname:
+        sites = await afind_sites(hostname)
+        if len(sites) == 1:
+            request._wagtail_site = sites[0]  # type: ignore[attr-defined]
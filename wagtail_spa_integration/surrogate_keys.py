@@ -0,0 +1,110 @@
+from collections.abc import Iterable
+from functools import lru_cache
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.http.response import HttpResponseBase
+from django.utils.module_loading import import_string
+from wagtail.models import Page
+
+from .indexes import get_site_paths
+
+# Listings of requests without a site
+PAGES_KEY = "pages"
+REDIRECTS_KEY = "redirects"
+SITEMAP_KEY = "sitemap"
+
+# Headers that separate keys with commas, others use spaces
+COMMA_SEPARATED_HEADERS = {"cache-tag"}
+
+
+def page_key(page_id: int) -> str:
+    return f"page-{page_id}"
+
+
+def site_key(site_id: int) -> str:
+    """Site wide documents: listings, sitemaps, route manifests and not found responses"""
+    return f"site-{site_id}"
+
+
+def type_key(content_type_id: int) -> str:
+    content_type = ContentType.objects.get_for_id(content_type_id)
+    return f"type-{content_type.app_label}.{content_type.model}"
+
+
+def get_surrogate_key_headers() -> list[str]:
+    """
+    Response headers to list surrogate keys in, e.g. ["Surrogate-Key", "Cache-Tag"].
+    Configured with SPA_SURROGATE_KEY_HEADERS, responses aren't tagged by default.
+    """
+    return list(getattr(settings, "SPA_SURROGATE_KEY_HEADERS", ()))
+
+
+def add_surrogate_keys(response: HttpResponseBase, keys: Iterable[str]) -> None:
+    headers = get_surrogate_key_headers()
+    if not headers:
+        return
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    for header in headers:
+        separator = "," if header.lower() in COMMA_SEPARATED_HEADERS else " "
+        response[header] = separator.join(keys)
+
+
+class SurrogateKeyPurger:
+    """
+    Purges cached responses tagged with surrogate keys from a CDN or caching proxy. Set
+    SPA_SURROGATE_KEY_PURGER to the dotted path of a subclass to purge on changes.
+    """
+
+    def purge(self, keys: set[str]) -> None:
+        raise NotImplementedError
+
+
+class LocalSurrogateKeyPurger(SurrogateKeyPurger):
+    """Records purged keys instead of purging them, for tests and development"""
+
+    def __init__(self) -> None:
+        self.purged: list[set[str]] = []
+        self.lock = threading.Lock()
+
+    def purge(self, keys: set[str]) -> None:
+        with self.lock:
+            self.purged.append(keys)
+
+
+@lru_cache
+def get_surrogate_key_purger() -> SurrogateKeyPurger | None:
+    path = getattr(settings, "SPA_SURROGATE_KEY_PURGER", None)
+    if not path:
+        return None
+    return import_string(path)()  # type: ignore[no-any-return]
+
+
+def purge_surrogate_keys(keys: set[str]) -> None:
+    """Purge keys once the current transaction commits, when a purger is configured"""
+    purger = get_surrogate_key_purger()
+    if purger is not None and keys:
+        transaction.on_commit(lambda: purger.purge(keys))
+
+
+def get_page_purge_keys(
+    page: Page, url_paths: Iterable[str], descendants: bool = False
+) -> set[str]:
+    """
+    Keys of responses that depend on page: its own responses, those of its children
+    (which show its title), or of all its descendants when its url or visibility
+    changed, and the site wide documents of every site serving it at any of url_paths.
+    Empty when no purger is configured.
+    """
+    if get_surrogate_key_purger() is None:
+        return set()
+    keys = {page_key(page.pk), type_key(page.content_type_id), PAGES_KEY}
+    for url_path in url_paths:
+        keys.update(site_key(site_id) for site_id in get_site_paths(url_path))
+    dependants = page.get_descendants() if descendants else page.get_children()
+    keys.update(page_key(pk) for pk in dependants.values_list("pk", flat=True))
+    return keys
@@ -1,19 +1,88 @@
+from concurrent.futures import Future
+from io import StringIO
+from pathlib import Path
+from typing import ClassVar
+from unittest import mock
+import gzip
+import json
+import pickle
+import tempfile
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import Http404
 from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIRequestFactory
 from wagtail.api.v2.router import WagtailAPIRouter
 from wagtail.contrib.redirects.models import Redirect
 from wagtail.models import Page, Site
 from wagtail.test.utils import WagtailPageTests
 
-from sandbox.models import FooPage
+from sandbox.api import api_router
+from sandbox.models import BarPage, FooPage, FooPageLink
 
+from .cache import get_cache
+from .models import ChangeLogEntry, DraftSlugIndex, PagePathIndex
+from .previews import get_preview_content_type, get_preview_page
+from .redirects import resolve_redirect
+from .renderers import msgpack, orjson
+from .sites import clear_site_index, find_sites
+from .surrogate_keys import (
+    REDIRECTS_KEY,
+    get_page_purge_keys,
+    get_surrogate_key_purger,
+)
 from .utils import hash_draft_code
-from .views import RedirectViewSet, SPAExtendedPagesAPIEndpoint, sitemap
+from .views import (
+    ChangeLogViewSet,
+    RedirectViewSet,
+    SPAExtendedPagesAPIEndpoint,
+    sitemap,
+)
 
 TEST_DRAFT_CODE = "abc"
 
 
+class InlineProcessPoolExecutor:
+    """
+    ProcessPoolExecutor running tasks in the test process, as worker processes can't
+    see the test transaction. Tasks must still pickle, as forkserver and spawn workers
+    need.
+    """
+
+    instances: ClassVar[list["InlineProcessPoolExecutor"]] = []
+
+    def __init__(self, max_workers, initializer):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.tasks = []
+        self.instances.append(self)
+
+    def __enter__(self):
+        pickle.dumps(self.initializer)
+        self.initializer()
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def submit(self, fn, *args):
+        pickle.loads(pickle.dumps((fn, args)))
+        self.tasks.append(args)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
 class WagtailSPAIntegrationTests(WagtailPageTests):
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+        # Sites are created in transactions that never commit, nothing clears it
+        clear_site_index()
+
     @override_settings(PREVIEW_DRAFT_CODE=TEST_DRAFT_CODE)
     def test_draft_api(self):
         home = Page.objects.last()
@@ -148,8 +217,11 @@ class WagtailSPAIntegrationTests(WagtailPageTests):
             "draft": hash_draft_code(TEST_DRAFT_CODE, foo.pk),
         }
         res = self.client.get(url, params)
+        self.assertEqual(res.data["id"], foo.pk)
 
-        self.assertEqual(res.status_code, 404)
+        params["draft"] = hash_draft_code(TEST_DRAFT_CODE, foo2.pk)
+        res = self.client.get(url, params)
+        self.assertEqual(res.data["id"], foo2.pk)
 
     @override_settings(PREVIEW_DRAFT_CODE=TEST_DRAFT_CODE)
     def test_draft_api_detail_with_incorrect_draft_value(self):
@@ -175,9 +247,86 @@ class WagtailSPAIntegrationTests(WagtailPageTests):
         params = {"site": site.hostname}
         request = RequestFactory().get("sitemap.xml", params)
         res = sitemap(request)
+        self.assertContains(res, site_hostname)
+        self.assertEqual(res["X-Robots-Tag"], "noindex, noodp, noarchive")
+
+        res = sitemap(request, content_type="text/xml")
+        self.assertEqual(res["Content-Type"], "text/xml")
+        self.assertEqual(res["X-Robots-Tag"], "noindex, noodp, noarchive")
         res.render()
         self.assertContains(res, site_hostname)
 
+    @override_settings(SPA_SITEMAP_PAGE_SIZE=1)
+    def test_sitemap_index(self):
+        home = Page.objects.last()
+        home.add_child(instance=FooPage(title="foo"))
+        params = {"site": "localhost"}
+
+        res = sitemap(RequestFactory().get("/sitemap.xml", params))
+        self.assertContains(res, "<sitemapindex")
+        self.assertContains(res, "/sitemap.xml?site=localhost&amp;p=2")
+        self.assertNotContains(res, "p=3")
+
+        res = sitemap(RequestFactory().get("/sitemap.xml", {**params, "p": 2}))
+        content = b"".join(res.streaming_content).decode()
+        self.assertIn("<urlset", content)
+        self.assertIn("/foo/</loc>", content)
+        self.assertEqual(content.count("<url>"), 1)
+
+        with self.assertRaises(Http404):
+            sitemap(RequestFactory().get("/sitemap.xml", {**params, "p": 3}))
+
+    @override_settings(SPA_SITEMAP_PAGE_SIZE=2)
+    def test_sitemap_cache(self):
+        home = Page.objects.last()
+        home.add_child(instance=FooPage(title="foo"))
+        home.add_child(instance=BarPage(title="bar"))
+
+        def get_sitemap(chunk, **headers):
+            params = {"site": "localhost", "p": chunk}
+            return sitemap(RequestFactory().get("/sitemap.xml", params, **headers))
+
+        # Streamed while it is rendered, then served from the cache
+        streamed = b"".join(get_sitemap(1).streaming_content)
+        first = get_sitemap(1)
+        self.assertEqual(first.content, streamed)
+        self.assertContains(first, "/foo/</loc>")
+        self.assertNotContains(first, "/bar/</loc>")
+        self.assertContains(get_sitemap(2), "/bar/</loc>")
+
+        res = get_sitemap(1, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+        # Only the chunk holding the published page is rendered again
+        baz = home.add_child(instance=BarPage(title="baz", live=False))
+        with self.captureOnCommitCallbacks(execute=True):
+            baz.save_revision().publish()
+            # Not invalidated until committed
+            self.assertNotContains(get_sitemap(2), "/baz/</loc>")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_sitemap(1)["ETag"], first["ETag"])
+        self.assertFalse(
+            [query for query in queries if '"live"' in query["sql"]], queries
+        )
+        content = b"".join(get_sitemap(2).streaming_content)
+        self.assertIn(b"/bar/</loc>", content)
+        self.assertIn(b"/baz/</loc>", content)
+
+        # A render started before the page changed doesn't store its stale chunk
+        with self.captureOnCommitCallbacks(execute=True):
+            baz.title = "qux"
+            baz.save_revision().publish()
+        baz.refresh_from_db()
+        stream = iter(get_sitemap(2).streaming_content)
+        self.assertIn(b"/baz/</loc>", next(stream))
+        with self.captureOnCommitCallbacks(execute=True):
+            baz.unpublish()
+        self.assertEqual(list(stream), [])
+        res = get_sitemap(2)
+        content = b"".join(res.streaming_content)
+        self.assertIn(b"/bar/</loc>", content)
+        self.assertNotIn(b"/baz/</loc>", content)
+
     def test_redirect_viewset(self):
         home = Page.objects.last()
         site_hostname = "http://example.com"
@@ -242,3 +391,815 @@ class WagtailSPAIntegrationTests(WagtailPageTests):
         params = {"html_path": "/"}
         res = self.client.get(url, params)
         self.assertContains(res, home.title)
+
+    def test_detail_by_path_indexes_path(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        PagePathIndex.objects.all().delete()
+
+        url = "/api/v2/pages/detail_by_path/"
+        res = self.client.get(url, {"html_path": "foo"})
+        self.assertEqual(res.data["id"], foo.pk)
+        entry = PagePathIndex.objects.get(page=foo)
+        self.assertEqual(entry.path, "/foo/")
+
+        # A stale entry is ignored and the tree is walked instead
+        entry.page = home
+        entry.save()
+        res = self.client.get(url, {"html_path": "/foo/"})
+        self.assertEqual(res.data["id"], foo.pk)
+
+    def test_path_index_publish_unpublish(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo", live=False)
+        home.add_child(instance=foo)
+        foo.save_revision().publish()
+        self.assertEqual(PagePathIndex.objects.get(page=foo).path, "/foo/")
+
+        foo.refresh_from_db()
+        foo.unpublish()
+        self.assertFalse(PagePathIndex.objects.filter(page=foo).exists())
+        res = self.client.get("/api/v2/pages/detail_by_path/", {"html_path": "/foo/"})
+        self.assertEqual(res.status_code, 404)
+
+    def test_draft_slug_index(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        foo.slug = "foo-edit"
+        foo.save_revision()
+        self.assertEqual(DraftSlugIndex.objects.get(page=foo).slug, "foo-edit")
+
+        foo.slug = "foo-edit-again"
+        foo.save_revision()
+        self.assertEqual(DraftSlugIndex.objects.get(page=foo).slug, "foo-edit-again")
+
+    def test_site_with_port(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        Site.objects.create(root_page=foo, hostname="example.com", port=8000)
+
+        url = "/api/v2/pages/detail_by_path/"
+        res = self.client.get(url, {"html_path": "/", "site": "example.com:8000"})
+        self.assertEqual(res.data["id"], foo.pk)
+        res = self.client.get(url, {"html_path": "/", "site": "example.com:9000"})
+        self.assertEqual(res.status_code, 404)
+
+    def test_site_index_invalidation(self):
+        home = Page.objects.last()
+        site = Site.objects.create(root_page=home, hostname="example.com")
+        self.assertEqual(find_sites("example.com"), [site])
+        site.hostname = "example.org"
+        with self.captureOnCommitCallbacks(execute=True):
+            site.save()
+            # Not cleared until committed
+            self.assertEqual(find_sites("example.com"), [site])
+        self.assertEqual(find_sites("example.com"), [])
+        self.assertEqual(find_sites("example.org:80"), [site])
+
+    @override_settings(PREVIEW_DRAFT_CODE=TEST_DRAFT_CODE)
+    def test_detail_conditional_get(self):
+        home = Page.objects.last().specific
+        url = f"/api/v2/pages/{home.pk}/"
+        res = self.client.get(url)
+        etag = res.headers["ETag"]
+        res = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        res = self.client.get(
+            "/api/v2/pages/detail_by_path/",
+            {"html_path": "/"},
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(res.status_code, 304)
+
+        # Draft responses have their own validators
+        draft = {"draft": hash_draft_code(TEST_DRAFT_CODE, home.pk)}
+        res = self.client.get(url, draft, headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers["ETag"], etag)
+
+        home.title = "edit it"
+        home.save_revision().publish()
+        res = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertContains(res, "edit it")
+
+    def test_redirect_snapshot(self):
+        home = Page.objects.last()
+        site = Site.objects.create(root_page=home, hostname="example.com")
+        other_site = Site.objects.create(root_page=home, hostname="example.org")
+        Redirect.objects.create(old_path="/a", redirect_link="https://a.com", site=site)
+        Redirect.objects.create(old_path="/b", redirect_link="https://b.com")
+        Redirect.objects.create(
+            old_path="/c", redirect_link="https://c.com", site=other_site
+        )
+
+        url = "/api/v2/redirects/snapshot/"
+        res = self.client.get(url, {"site": "example.com"})
+        links = [redirect["link"] for redirect in res.json()["redirects"]]
+        self.assertEqual(links, ["https://a.com", "https://b.com"])
+
+        etag = res.headers["ETag"]
+        res = self.client.get(
+            url, {"site": "example.com"}, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(res.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Redirect.objects.create(old_path="/d", redirect_link="https://d.com")
+            # Not invalidated until committed
+            res = self.client.get(
+                url, {"site": "example.com"}, headers={"If-None-Match": etag}
+            )
+            self.assertEqual(res.status_code, 304)
+        res = self.client.get(
+            url,
+            {"site": "example.com"},
+            headers={"If-None-Match": etag, "Accept-Encoding": "gzip"},
+        )
+        self.assertEqual(res.headers["Content-Encoding"], "gzip")
+        self.assertIn(b"https://d.com", gzip.decompress(res.content))
+
+        # Each encoding is a representation of its own
+        gzip_etag = res.headers["ETag"]
+        res = self.client.get(
+            url, {"site": "example.com"}, headers={"If-None-Match": gzip_etag}
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("Content-Encoding", res.headers)
+        self.assertNotEqual(res.headers["ETag"], gzip_etag)
+        for accept_encoding in ("gzip;q=0", "br, *;q=0", "identity"):
+            res = self.client.get(
+                url,
+                {"site": "example.com"},
+                headers={"Accept-Encoding": accept_encoding},
+            )
+            self.assertNotIn("Content-Encoding", res.headers)
+        for accept_encoding in ("br;q=1.0, GZIP;q=0.5", "*"):
+            res = self.client.get(
+                url,
+                {"site": "example.com"},
+                headers={"Accept-Encoding": accept_encoding},
+            )
+            self.assertEqual(res.headers["Content-Encoding"], "gzip")
+
+    def test_redirect_resolve(self):
+        home = Page.objects.last()
+        site = Site.objects.create(root_page=home, hostname="example.com")
+        Redirect.objects.create(
+            old_path="/old?b=2&a=1", redirect_link="https://query.com", site=site
+        )
+        Redirect.objects.create(old_path="/old", redirect_link="https://any.com")
+        Redirect.objects.create(
+            old_path="/old", redirect_link="https://site.com", site=site
+        )
+
+        url = "/api/v2/redirects/resolve/"
+        res = self.client.get(
+            url, {"html_path": "/old/?a=1&b=2", "site": site.hostname}
+        )
+        self.assertEqual(res.data["link"], "https://query.com")
+        res = self.client.get(url, {"html_path": "/old/?c=3", "site": site.hostname})
+        self.assertEqual(res.data["link"], "https://site.com")
+        res = self.client.get(url, {"html_path": "old"})
+        self.assertEqual(res.data["link"], "https://any.com")
+        res = self.client.get(url, {"html_path": "/new/"})
+        self.assertEqual(res.status_code, 404)
+
+    def test_redirect_resolve_without_site(self):
+        home = Page.objects.last()
+        other_site = Site.objects.create(root_page=home, hostname="other.com")
+        Redirect.objects.create(
+            old_path="/c", redirect_link="https://other.com/c", site=other_site
+        )
+        Redirect.objects.create(old_path="/c", redirect_link="https://any.com/c")
+        Redirect.objects.create(
+            old_path="/d", redirect_link="https://other.com/d", site=other_site
+        )
+
+        self.assertEqual(resolve_redirect(None, "/c")["link"], "https://any.com/c")
+        self.assertIsNone(resolve_redirect(None, "/d"))
+
+        Site.objects.update(is_default_site=False)
+        url = "/api/v2/redirects/resolve/"
+        res = self.client.get(url, {"html_path": "/c"})
+        self.assertEqual(res.data["link"], "https://any.com/c")
+        res = self.client.get(url, {"html_path": "/d"})
+        self.assertEqual(res.status_code, 404)
+
+    def test_exclude_multiple_types(self):
+        home = Page.objects.last()
+        home.add_child(instance=FooPage(title="foo"))
+        home.add_child(instance=BarPage(title="bar"))
+        params = {"exclude_type": "sandbox.FooPage,sandbox.BarPage"}
+        request = APIRequestFactory().get("", params)
+        request.site = Site.objects.first()
+        request.wagtailapi_router = WagtailAPIRouter("wagtailapi")
+        page_list = SPAExtendedPagesAPIEndpoint.as_view({"get": "listing_view"})
+        res = page_list(request)
+        self.assertEqual(res.data["meta"]["total_count"], 1)
+
+    def test_batch_view(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo", body="foo body")
+        bar = BarPage(title="bar")
+        home.add_child(instance=foo)
+        home.add_child(instance=bar)
+        self.client.get("/api/v2/pages/detail_by_path/", {"html_path": "/bar/"})
+
+        url = "/api/v2/pages/batch/"
+        params = {"html_path": ["/foo/", "/bar/", "/nope/"], "id": [str(home.pk)]}
+        res = self.client.get(url, params)
+        items = res.json()["items"]
+        self.assertEqual(
+            [item.get("data", {}).get("id") for item in items],
+            [foo.pk, bar.pk, None, home.pk],
+        )
+        self.assertEqual(items[0]["data"]["body"], "foo body")
+        self.assertEqual(
+            items[2], {"html_path": "/nope/", "status": 404, "message": "not found"}
+        )
+
+    @override_settings(PREVIEW_DRAFT_CODE=TEST_DRAFT_CODE)
+    def test_draft_api_cached_by_revision(self):
+        home = Page.objects.last().specific
+        home.title = "edit it"
+        home.save_revision()
+
+        url = f"/api/v2/pages/{home.pk}/"
+        params = {"draft": hash_draft_code(TEST_DRAFT_CODE, home.pk)}
+        with CaptureQueriesContext(connection) as first:
+            self.assertContains(self.client.get(url, params), "edit it")
+        with CaptureQueriesContext(connection) as repeat:
+            self.assertContains(self.client.get(url, params), "edit it")
+        self.assertLess(len(repeat), len(first))
+
+        home.title = "edit it again"
+        home.save_revision()
+        self.assertContains(self.client.get(url, params), "edit it again")
+
+    @override_settings(SPA_RESPONSE_CACHE={"ENDPOINTS": ["detail", "listing"]})
+    def test_response_cache(self):
+        home = Page.objects.last().specific
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+
+        url = f"/api/v2/pages/{foo.pk}/"
+        with CaptureQueriesContext(connection) as first:
+            self.assertContains(self.client.get(url), "foo")
+        with CaptureQueriesContext(connection) as repeat:
+            self.assertContains(self.client.get(url), "foo")
+        self.assertLess(len(repeat), len(first))
+
+        foo.title = "foo edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            foo.save_revision().publish()
+        self.assertContains(self.client.get(url), "foo edited")
+
+        listing_url = "/api/v2/pages/"
+        self.assertEqual(self.client.get(listing_url).data["meta"]["total_count"], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Page.objects.get(pk=foo.pk).delete()
+            # Not invalidated until committed
+            response = self.client.get(listing_url)
+            self.assertEqual(response.data["meta"]["total_count"], 2)
+        self.assertEqual(self.client.get(listing_url).data["meta"]["total_count"], 1)
+
+    def test_page_preview_memoized(self):
+        home = Page.objects.last().specific
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        foo.title = "foo preview"
+        preview = foo.create_page_preview()
+
+        url = "/api/v2/page_preview/1/"
+        params = {"content_type": "sandbox.foopage", "token": preview.token}
+        self.assertContains(self.client.get(url, params), "foo preview")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(url, params), "foo preview")
+        for query in queries:
+            self.assertNotIn("pagepreview", query["sql"])
+            self.assertNotIn("django_content_type", query["sql"])
+
+        foo.title = "foo preview edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            foo.update_page_preview(preview.token)
+        self.assertContains(self.client.get(url, params), "foo preview edited")
+
+        page = get_preview_page(
+            get_preview_content_type("sandbox.foopage"), preview.token
+        )
+        page.title = "changed by another request"
+        self.assertContains(self.client.get(url, params), "foo preview edited")
+
+    @override_settings(SPA_PREVIEW_STREAM_KEEPALIVE=0)
+    def test_page_preview_stream(self):
+        home = Page.objects.last().specific
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        foo.title = "foo preview"
+        preview = foo.create_page_preview()
+
+        url = "/api/v2/page_preview/stream/"
+        res = self.client.get(url, {"content_type": "sandbox.foopage", "token": "x"})
+        self.assertEqual(res.status_code, 400)
+
+        res = self.client.get(
+            url, {"content_type": "sandbox.foopage", "token": preview.token}
+        )
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        events = iter(res.streaming_content)
+        self.assertIn(b"foo preview", next(events))
+        self.assertEqual(next(events), b": keepalive\n\n")
+
+        foo.title = "foo preview edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            foo.update_page_preview(preview.token)
+            # Not published until committed
+            self.assertEqual(next(events), b": keepalive\n\n")
+        event = next(events)
+        self.assertTrue(event.startswith(b"event: preview\n"))
+        self.assertIn(b"foo preview edited", event)
+        res.close()
+
+    @override_settings(SPA_PREVIEW_STREAM_KEEPALIVE=0)
+    def test_page_preview_stream_asgi(self):
+        home = Page.objects.last().specific
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        foo.title = "foo preview"
+        preview = foo.create_page_preview()
+
+        def update_preview():
+            foo.title = "foo preview edited"
+            with self.captureOnCommitCallbacks(execute=True):
+                foo.update_page_preview(preview.token)
+
+        async def read_stream():
+            res = await self.async_client.get(
+                "/api/v2/page_preview/stream/",
+                {"content_type": "sandbox.foopage", "token": preview.token},
+            )
+            self.assertTrue(res.is_async)
+            events = aiter(res.streaming_content)
+            self.assertIn(b"foo preview", await anext(events))
+            self.assertEqual(await anext(events), b": keepalive\n\n")
+            await sync_to_async(update_preview)()
+            event = await anext(events)
+            self.assertTrue(event.startswith(b"event: preview\n"))
+            self.assertIn(b"foo preview edited", event)
+            await events.aclose()
+
+        async_to_sync(read_stream)()
+
+    def test_instrumentation(self):
+        home = Page.objects.last()
+        url = "/api/v2/pages/detail_by_path/"
+        params = {"html_path": "/", "site": "localhost"}
+        self.assertNotIn("Server-Timing", self.client.get(url, params))
+
+        recorded = []
+        with override_settings(
+            SPA_INSTRUMENTATION=True,
+            SPA_INSTRUMENTATION_HOOK=lambda request, phases: recorded.extend(phases),
+        ):
+            res = self.client.get(url, params)
+        self.assertContains(res, home.title)
+        for phase in ("site", "route", "queryset", "serialize"):
+            self.assertIn(f"{phase};dur=", res["Server-Timing"])
+        phases = {phase.name: phase for phase in recorded}
+        self.assertGreater(phases["route"].queries, 0)
+
+    @override_settings(PREVIEW_DRAFT_CODE=TEST_DRAFT_CODE)
+    def test_async_views(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        foo.title = "foo draft"
+        foo.slug = "foo-draft"
+        foo.save_revision()
+        Redirect.objects.create(old_path="/old", redirect_link="https://new.com")
+        get = async_to_sync(self.async_client.get)
+
+        url = "/api/v2/async_pages/detail_by_path/"
+        params = {"html_path": "/foo/", "site": "localhost"}
+        expected = self.client.get("/api/v2/pages/detail_by_path/", params).json()
+        # Routed by the sync view, then served from the path index
+        self.assertEqual(get(url, params).json(), expected)
+        self.assertEqual(get(url, params).json(), expected)
+        self.assertEqual(get(f"/api/v2/async_pages/{foo.pk}/").json(), expected)
+        self.assertEqual(
+            get(url, {"html_path": "/nope/", "site": "localhost"}).status_code, 404
+        )
+
+        draft_code = hash_draft_code(TEST_DRAFT_CODE, foo.pk)
+        res = get(url, {"html_path": "/foo-draft/", "draft": draft_code})
+        self.assertEqual(res.json()["title"], "foo draft")
+        expected = self.client.get(
+            f"/api/v2/pages/{foo.pk}/", {"draft": draft_code}
+        ).json()
+        res = get(f"/api/v2/async_pages/{foo.pk}/", {"draft": draft_code})
+        self.assertEqual(res.json(), expected)
+        self.assertEqual(expected["title"], "foo draft")
+        res = get(
+            "/api/v2/async_pages/999/", {"draft": hash_draft_code(TEST_DRAFT_CODE, 999)}
+        )
+        self.assertEqual(res.status_code, 404)
+
+        url = "/api/v2/async_redirects/resolve/"
+        headers = ["Surrogate-Key", "Cache-Tag"]
+        with override_settings(SPA_SURROGATE_KEY_HEADERS=headers):
+            res = get(url, {"html_path": "/old/"})
+            self.assertEqual(res.json()["link"], "https://new.com")
+            self.assertEqual(res.headers["Surrogate-Key"], REDIRECTS_KEY)
+            self.assertEqual(res.headers["Cache-Tag"], REDIRECTS_KEY)
+            for params in [
+                {"html_path": "/new/"},
+                {"html_path": "/old/", "site": "nope"},
+                {},
+            ]:
+                res = get(url, params)
+                expected = self.client.get("/api/v2/redirects/resolve/", params)
+                self.assertEqual(res.status_code, expected.status_code)
+                self.assertEqual(res.json(), expected.json())
+                self.assertEqual(res.headers["Surrogate-Key"], REDIRECTS_KEY)
+
+    def test_export_spa_pages(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        bar = FooPage(title="bar")
+        foo.add_child(instance=bar)
+        baz = FooPage(title="baz")
+        home.add_child(instance=baz)
+        with tempfile.TemporaryDirectory() as output:
+            out = Path(output)
+            args = [output, "--site", "localhost", "--workers", "1"]
+            call_command("export_spa_pages", *args, stdout=StringIO())
+            self.assertEqual(
+                json.loads((out / "foo/bar/index.json").read_text())["title"], "bar"
+            )
+            self.assertTrue((out / "index.json").exists())
+            self.assertTrue((out / "baz/index.json").exists())
+
+            (out / "index.json").unlink()
+            bar.title = "bar edited"
+            bar.save_revision().publish()
+            baz.unpublish()
+            call_command("export_spa_pages", *args, "--incremental", stdout=StringIO())
+            self.assertEqual(
+                json.loads((out / "foo/bar/index.json").read_text())["title"],
+                "bar edited",
+            )
+            # Unchanged pages aren't rendered again, unpublished ones are removed
+            self.assertFalse((out / "index.json").exists())
+            self.assertFalse((out / "baz/index.json").exists())
+
+        InlineProcessPoolExecutor.instances.clear()
+        with (
+            tempfile.TemporaryDirectory() as output,
+            mock.patch(
+                "wagtail_spa_integration.management.commands.export_spa_pages."
+                "ProcessPoolExecutor",
+                InlineProcessPoolExecutor,
+            ),
+            mock.patch.object(connections, "close_all") as close_all,
+        ):
+            out = Path(output)
+            args = [output, "--site", "localhost", "--workers", "2"]
+            call_command("export_spa_pages", *args, stdout=StringIO())
+            close_all.assert_called_once()
+            [executor] = InlineProcessPoolExecutor.instances
+            self.assertEqual(executor.max_workers, 2)
+            # Every page is exported by exactly one task
+            pages = [page for task in executor.tasks for page in task[-1]]
+            self.assertEqual(len(executor.tasks), 3)
+            self.assertEqual(
+                sorted(pk for pk, path in pages), [home.pk, foo.pk, bar.pk]
+            )
+            self.assertEqual(
+                json.loads((out / "foo/bar/index.json").read_text())["title"],
+                "bar edited",
+            )
+            self.assertTrue((out / "index.json").exists())
+
+    def test_routes(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        bar = BarPage(title="bar")
+        foo.add_child(instance=bar)
+        url = "/api/v2/pages/routes/"
+
+        res = self.client.get(url, {"site": "localhost"})
+        manifest = res.json()
+        self.assertTrue(manifest["full"])
+        routes = {
+            path: (pk, manifest["types"][type_index])
+            for pk, path, type_index in zip(
+                manifest["ids"], manifest["paths"], manifest["type_indexes"]
+            )
+        }
+        self.assertEqual(routes["/foo/"], (foo.pk, "sandbox.FooPage"))
+        self.assertEqual(routes["/foo/bar/"], (bar.pk, "sandbox.BarPage"))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res.headers["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+        # Publishing without changing any route keeps the version
+        foo.title = "foo edited"
+        foo.save_revision().publish()
+        res = self.client.get(url, {"since": manifest["version"]})
+        self.assertEqual(res.json()["ids"], [])
+
+        baz = FooPage(title="baz")
+        home.add_child(instance=baz)
+        with self.captureOnCommitCallbacks(execute=True):
+            baz.save_revision().publish()
+            bar.unpublish()
+            # Not invalidated until committed
+            res = self.client.get(url, {"since": manifest["version"]})
+            self.assertEqual(res.json()["ids"], [])
+        delta = self.client.get(url, {"since": manifest["version"]}).json()
+        self.assertFalse(delta["full"])
+        self.assertEqual(delta["ids"], [baz.pk])
+        self.assertEqual(delta["paths"], ["/baz/"])
+        self.assertEqual(delta["removed"], [bar.pk])
+
+        res = self.client.get(url, {"since": "unknown"})
+        self.assertTrue(res.json()["full"])
+        self.assertEqual(self.client.get(url, {"site": "nope"}).status_code, 404)
+
+    def test_change_log(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        bar = FooPage(title="bar")
+        home.add_child(instance=bar)
+        url = "/api/v2/changes/"
+        cursor = self.client.get(url, {"after": "latest"}).json()["cursor"]
+
+        foo.save_revision().publish()
+        foo.move(bar, pos="last-child")
+        Redirect.objects.create(old_path="/foo", redirect_page=foo)
+        foo.refresh_from_db()
+        foo.unpublish()
+        res = self.client.get(url, {"after": cursor, "site": "localhost"}).json()
+        self.assertFalse(res["has_more"])
+        self.assertEqual(
+            [
+                (
+                    entry["action"],
+                    entry["page_id"],
+                    entry["old_path"],
+                    entry["new_path"],
+                )
+                for entry in res["entries"]
+            ],
+            [
+                ("publish", foo.pk, "/foo/", "/foo/"),
+                ("move", foo.pk, "/foo/", "/bar/foo/"),
+                ("redirect_save", foo.pk, "/foo", ""),
+                ("unpublish", foo.pk, "/bar/foo/", ""),
+            ],
+        )
+        self.assertEqual(res["entries"][0]["site"], "localhost")
+        self.assertEqual(res["cursor"], ChangeLogEntry.objects.last().pk)
+
+        res = self.client.get(url, {"after": cursor, "limit": 1}).json()
+        self.assertTrue(res["has_more"])
+        res = self.client.get(url, {"after": res["cursor"], "limit": 1}).json()
+        self.assertEqual(res["entries"][0]["action"], "move")
+
+    def test_change_log_endpoint_with_child_relations(self):
+        # Nested objects look up their endpoint by model among every endpoint
+        self.assertEqual(
+            api_router.get_model_endpoint(ChangeLogEntry), ("changes", ChangeLogViewSet)
+        )
+        home = Page.objects.last()
+        foo = FooPage(title="foo", links=[FooPageLink(title="home", link_page=home)])
+        home.add_child(instance=foo)
+
+        res = self.client.get(f"/api/v2/pages/{foo.pk}/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["links"][0]["title"], "home")
+        self.assertEqual(res.json()["links"][0]["link_page"]["id"], home.pk)
+
+    @override_settings(
+        SPA_SURROGATE_KEY_HEADERS=["Surrogate-Key", "Cache-Tag"],
+        SPA_SURROGATE_KEY_PURGER="wagtail_spa_integration.surrogate_keys.LocalSurrogateKeyPurger",
+    )
+    def test_surrogate_keys(self):
+        get_surrogate_key_purger.cache_clear()
+        self.addCleanup(get_surrogate_key_purger.cache_clear)
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+        bar = FooPage(title="bar")
+        foo.add_child(instance=bar)
+        site = Site.objects.get(is_default_site=True)
+
+        res = self.client.get(f"/api/v2/pages/{foo.pk}/")
+        self.assertEqual(
+            res.headers["Surrogate-Key"], f"page-{foo.pk} type-sandbox.foopage"
+        )
+        self.assertEqual(
+            res.headers["Cache-Tag"], f"page-{foo.pk},type-sandbox.foopage"
+        )
+        res = self.client.get("/api/v2/pages/detail_by_path/", {"html_path": "/nope/"})
+        self.assertEqual(res.headers["Surrogate-Key"], f"site-{site.pk}")
+        res = self.client.get("/api/v2/pages/")
+        self.assertEqual(res.headers["Surrogate-Key"], f"site-{site.pk}")
+        res = self.client.get("/api/v2/redirects/")
+        self.assertEqual(res.headers["Surrogate-Key"], "redirects")
+        res = self.client.get("/sitemap.xml")
+        self.assertEqual(res.headers["Surrogate-Key"], f"site-{site.pk} sitemap")
+
+        purger = get_surrogate_key_purger()
+        with self.captureOnCommitCallbacks(execute=True):
+            foo.save_revision().publish()
+        self.assertEqual(
+            purger.purged,
+            [
+                {
+                    f"page-{foo.pk}",
+                    f"page-{bar.pk}",
+                    "type-sandbox.foopage",
+                    f"site-{site.pk}",
+                    "pages",
+                }
+            ],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Redirect.objects.create(old_path="/old", redirect_page=foo)
+        self.assertEqual(purger.purged[-1], {"redirects"})
+
+    def test_surrogate_keys_disabled(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo")
+        home.add_child(instance=foo)
+
+        res = self.client.get(f"/api/v2/pages/{foo.pk}/")
+        self.assertNotIn("Surrogate-Key", res.headers)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_page_purge_keys(foo, [foo.url_path]), set())
+        self.assertEqual(len(queries), 0)
+
+    def test_cursor_pagination(self):
+        home = Page.objects.last()
+        pages = []
+        for i in range(5):
+            page = FooPage(title=f"foo {i}")
+            home.add_child(instance=page)
+            if i % 2:
+                page.save_revision().publish()
+            pages.append(page)
+        home.add_child(instance=BarPage(title="bar"))
+
+        def get_all(params):
+            ids = []
+            params = {"site": "localhost", "limit": 2, "cursor": "", **params}
+            while True:
+                res = self.client.get("/api/v2/pages/", params).json()
+                ids += [item["id"] for item in res["items"]]
+                if res["meta"]["next_cursor"] is None:
+                    return ids
+                params["cursor"] = res["meta"]["next_cursor"]
+
+        expected = self.client.get(
+            "/api/v2/pages/", {"site": "localhost", "exclude_type": "sandbox.BarPage"}
+        ).json()["items"]
+        self.assertEqual(
+            get_all({"exclude_type": "sandbox.BarPage"}),
+            [item["id"] for item in expected],
+        )
+        self.assertEqual(
+            get_all({"order": "path", "exclude_type": "sandbox.BarPage"}),
+            [item["id"] for item in expected],
+        )
+        self.assertEqual(
+            get_all({"order": "-path", "exclude_type": "sandbox.BarPage"}),
+            [item["id"] for item in reversed(expected)],
+        )
+        self.assertEqual(
+            get_all({"order": "-id", "type": "sandbox.FooPage"}),
+            sorted([page.pk for page in pages], reverse=True),
+        )
+        # Unpublished dates sort last
+        self.assertEqual(
+            get_all({"order": "first_published_at", "type": "sandbox.FooPage"}),
+            [pages[1].pk, pages[3].pk, pages[0].pk, pages[2].pk, pages[4].pk],
+        )
+        res = self.client.get("/api/v2/pages/", {"cursor": "", "order": "title"})
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get("/api/v2/pages/", {"cursor": "nope"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_renderers(self):
+        home = Page.objects.last()
+        foo = FooPage(title="foo \u2028 ü")
+        home.add_child(instance=foo)
+        foo.save_revision().publish()
+        Redirect.objects.create(old_path="/old", redirect_page=foo)
+        urls = [f"/api/v2/pages/{foo.pk}/", "/api/v2/pages/", "/api/v2/redirects/"]
+        expected = [self.client.get(url).content for url in urls]
+
+        renderers = [
+            "wagtail_spa_integration.renderers.ORJSONRenderer",
+            "wagtail_spa_integration.renderers.MessagePackRenderer",
+        ]
+        with override_settings(SPA_API_RENDERERS=renderers):
+            if orjson is None:
+                self.skipTest("orjson is not installed")
+            for url, content in zip(urls, expected):
+                res = self.client.get(url)
+                self.assertEqual(res.content, content)
+                self.assertIn("Accept", res.headers["Vary"])
+            if msgpack is None:
+                self.skipTest("msgpack is not installed")
+            for url, content in zip(urls, expected):
+                res = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+                self.assertEqual(res.headers["Content-Type"], "application/msgpack")
+                self.assertEqual(msgpack.unpackb(res.content), json.loads(content))
+
+    def test_listing_prefetch(self):
+        home = Page.objects.last()
+        params = {
+            "type": "sandbox.FooPage",
+            "fields": "related_page,links(title,link_page),locale",
+            "limit": 20,
+        }
+
+        def add_pages(count):
+            for i in range(count):
+                page = FooPage(title=f"foo {i}", related_page=home)
+                page.links = [
+                    FooPageLink(title="link", link_page=home),
+                    FooPageLink(title="link", link_page=home),
+                ]
+                home.add_child(instance=page)
+
+        def count_queries():
+            queries = []
+
+            def execute(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(execute):
+                res = self.client.get("/api/v2/pages/", params)
+            self.assertEqual(res.status_code, 200)
+            return len(queries), res.json()["items"]
+
+        add_pages(2)
+        count_queries()  # Warm the content type and site caches
+        few, items = count_queries()
+        self.assertEqual(items[0]["related_page"]["id"], home.pk)
+        self.assertEqual(items[0]["links"][1]["link_page"]["id"], home.pk)
+        add_pages(8)
+        many, items = count_queries()
+        self.assertEqual(len(items), 10)
+        self.assertEqual(many, few)
+
+    def test_detail_by_path_redirects(self):
+        Redirect.objects.create(old_path="/old", redirect_link="https://new.com")
+        url = "/api/v2/pages/detail_by_path/"
+        params = {"html_path": "/old/", "site": "localhost"}
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 404)
+        self.assertNotIn("redirect", res.json())
+
+        with override_settings(SPA_DETAIL_BY_PATH_REDIRECTS=True):
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, 404)
+            redirect = res.json()["redirect"]
+            self.assertEqual(redirect["link"], "https://new.com")
+            self.assertTrue(redirect["is_permanent"])
+            res = self.client.get(url, {"html_path": "/nope/", "site": "localhost"})
+            self.assertEqual(res.json(), {"message": "not found"})
+            res = self.client.get(url, {**params, "draft": "nope"})
+            self.assertEqual(res.json()["redirect"]["link"], "https://new.com")
+
+    @override_settings(SPA_DETAIL_BY_PATH_REDIRECTS=True)
+    def test_detail_by_path_redirects_of_other_sites(self):
+        home = Page.objects.last()
+        other_site = Site.objects.create(root_page=home, hostname="other.com")
+        Redirect.objects.create(
+            old_path="/c", redirect_link="https://other.com/c", site=other_site
+        )
+        url = "/api/v2/pages/detail_by_path/"
+
+        res = self.client.get(url, {"html_path": "/c/", "site": "localhost"})
+        self.assertEqual(res.json(), {"message": "not found"})
+        res = self.client.get(url, {"html_path": "/c/", "site": "other.com"})
+        self.assertEqual(res.json()["redirect"]["link"], "https://other.com/c")
+
+        # Requests matching no site only get redirects without a site
+        Site.objects.update(is_default_site=False)
+        res = self.client.get(url, {"html_path": "/c/"})
+        self.assertEqual(res.status_code, 404)
+        self.assertNotIn("redirect", res.json())
+        with self.captureOnCommitCallbacks(execute=True):
+            Redirect.objects.create(old_path="/c", redirect_link="https://any.com/c")
+        res = self.client.get(url, {"html_path": "/c/"})
+        self.assertEqual(res.json()["redirect"]["link"], "https://any.com/c")
@@ -1,8 +1,14 @@
+from collections.abc import Iterable
+from functools import lru_cache
 from typing import Generic, Protocol, TypeVar
 import hashlib
 
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
 from django.db.models import QuerySet
+from django.utils.http import quote_etag
 from django.utils.timezone import datetime  # type: ignore[attr-defined]
+from wagtail.api.v2.utils import page_models_from_string
 from wagtail.models import Page
 
 PageType = TypeVar("PageType", bound=Page)
@@ -16,12 +22,32 @@ class PageQuerySet(QuerySet[PageType], PageQuerySetMixin[PageType], Generic[Page
     pass
 
 
+def get_page_type_content_type_ids(page_models: Iterable[type[Page]]) -> list[int]:
+    """Content type ids of the given page models and all of their subclasses"""
+    base_models = tuple(page_models)
+    all_subclasses = {
+        model for model in apps.get_models() if issubclass(model, base_models)
+    }
+    content_types = ContentType.objects.get_for_models(*all_subclasses)
+    return sorted(content_type.pk for content_type in content_types.values())
+
+
+@lru_cache(maxsize=256)
+def content_type_ids_from_string(model_strings: str) -> tuple[int, ...]:
+    """
+    Memoized content type ids of a comma separated `app_label.Model` list and the
+    subclasses of those models. Raises LookupError or ValueError for unknown types.
+    """
+    return tuple(get_page_type_content_type_ids(page_models_from_string(model_strings)))
+
+
 def exclude_page_type(
     queryset: PageQuerySet[PageType], page_models: list[type[PageType]]
 ) -> PageQuerySet[PageType]:
-    qs: PageQuerySet[PageType] = queryset.none()
-    for model in page_models:
-        qs |= queryset.not_type(model)
+    """Exclude pages of any of page_models (or their subclasses) in a single NOT IN"""
+    qs: PageQuerySet[PageType] = queryset.exclude(
+        content_type_id__in=get_page_type_content_type_ids(page_models)
+    )
     return qs
 
 
@@ -31,3 +57,32 @@ def hash_draft_code(code: str, page_id: int) -> str:
     combined_code = date_code + code + str(page_id)
     hashed_code = hashlib.sha256(combined_code.encode())
     return hashed_code.hexdigest()
+
+
+def hash_etag(*parts: object) -> str:
+    """Quoted strong ETag from the given parts"""
+    hashed = hashlib.sha256(":".join(str(part) for part in parts).encode())
+    return quote_etag(hashed.hexdigest()[:32])
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows a content coding, by its own entry or else
+    the `*` entry. Entries with q=0 refuse the coding.
+    """
+    qualities: dict[str, float] = {}
+    for entry in accept_encoding.split(","):
+        name, *params = (part.strip() for part in entry.split(";"))
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    quality = qualities.get(encoding, qualities.get("*", 0.0))
+    return quality > 0
@@ -1,32 +1,110 @@
+from datetime import datetime
 from typing import Any
 
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q, QuerySet
 from django.http import (
     Http404,
     HttpRequest,
+    HttpResponse,
     HttpResponsePermanentRedirect,
     HttpResponseRedirect,
+    StreamingHttpResponse,
 )
+from django.http.response import HttpResponseBase
 from django.shortcuts import get_object_or_404, redirect
-from django.template.response import TemplateResponse
 from django.urls import URLPattern, path
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django_filters import rest_framework as filters
 from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
 from rest_framework.response import Response
-from wagtail.api.v2.utils import BadRequestError, page_models_from_string
+from wagtail.api.v2.filters import OrderingFilter
+from wagtail.api.v2.serializers import BaseSerializer
+from wagtail.api.v2.utils import BadRequestError, parse_fields_parameter
 from wagtail.api.v2.views import PagesAPIViewSet
 from wagtail.contrib.redirects.models import Redirect
 from wagtail.contrib.sitemaps.sitemap_generator import Sitemap
 from wagtail.contrib.sitemaps.views import sitemap as wagtail_sitemap
-from wagtail.models import Page, PageQuerySet, Revision, Site
+from wagtail.models import Page, PageQuerySet, PageViewRestriction, Site
+
+from .cache import (
+    KEY_PREFIX,
+    PAGES_VERSION,
+    get_cache,
+    get_response_cache_config,
+    get_version,
+    page_version_name,
+)
+from .filters import RedirectFilter, SPAOrderingFilter
+from .indexes import (
+    find_draft_slug_candidates,
+    find_page_by_path,
+    find_page_ids_by_paths,
+    index_page_path,
+)
+from .instrumentation import DISABLED_TIMER, RequestTimer, get_request_timer
+from .models import ChangeLogEntry
+from .pagination import SPAPagination
+from .prefetching import get_prefetch_plan
+from .redirects import (
+    get_redirect_snapshot,
+    get_redirect_snapshot_etag,
+    get_redirects_version,
+    resolve_redirect,
+)
+from .renderers import ConfigurableRenderersMixin
+from .routes import (
+    get_older_route_manifest,
+    get_route_manifest,
+    get_route_manifest_delta,
+)
+from .serializers import ChangeLogEntrySerializer, RedirectSerializer
+from .sitemaps import (
+    SitemapChunk,
+    get_sitemap_chunk,
+    get_sitemap_chunk_url,
+    get_sitemap_layout,
+    get_sitemap_site,
+    render_sitemap_index,
+)
+from .sites import find_sites, set_request_site
+from .surrogate_keys import (
+    PAGES_KEY,
+    REDIRECTS_KEY,
+    SITEMAP_KEY,
+    add_surrogate_keys,
+    get_surrogate_key_headers,
+    page_key,
+    site_key,
+    type_key,
+)
+from .utils import (
+    accepts_encoding,
+    content_type_ids_from_string,
+    hash_draft_code,
+    hash_etag,
+)
 
-from .filters import RedirectFilter
-from .serializers import RedirectSerializer
-from .utils import exclude_page_type, hash_draft_code
+# Default and maximum number of change log entries per response
+CHANGE_LOG_LIMIT = 100
+CHANGE_LOG_LIMIT_MAX = 1000
+
+PAGE_STATE_FIELDS = (
+    "content_type_id",
+    "live_revision_id",
+    "latest_revision_id",
+    "has_unpublished_changes",
+    "last_published_at",
+    "latest_revision_created_at",
+)
 
 
-class SPAExtendedPagesAPIEndpoint(PagesAPIViewSet):
+class SPAExtendedPagesAPIEndpoint(ConfigurableRenderersMixin, PagesAPIViewSet):
     """
     Wagtail preview doesn't work with a JS client
 
@@ -44,35 +122,266 @@ class SPAExtendedPagesAPIEndpoint(PagesAPIViewSet):
     known_query_parameters = PagesAPIViewSet.known_query_parameters.union(
         [
             "exclude_type",
+            "cursor",
         ]
     )
+    filter_backends = tuple(
+        SPAOrderingFilter if backend is OrderingFilter else backend
+        for backend in PagesAPIViewSet.filter_backends
+    )
+    pagination_class = SPAPagination
+    resolved_page: Page | None = None
+    resolved_draft_state: tuple[int, dict[str, Any]] | None = None
+    timer: RequestTimer = DISABLED_TIMER
+    surrogate_keys: set[str]
+    surrogate_keys_enabled = False
+
+    def dispatch(
+        self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponseBase:
+        """
+        Record phase timings when SPA_INSTRUMENTATION is enabled, and tag the response
+        with the surrogate keys collected by the view
+        """
+        self.timer = get_request_timer()
+        self.surrogate_keys = set()
+        self.surrogate_keys_enabled = bool(get_surrogate_key_headers())
+        with self.timer.record(), self.timer.phase("other"):
+            response = super().dispatch(request, *args, **kwargs)
+            if self.surrogate_keys_enabled:
+                if response.status_code == 404 or not self.surrogate_keys:
+                    # Not found responses change when a page is published at their path
+                    self.surrogate_keys.add(self.get_site_surrogate_key())
+                add_surrogate_keys(response, self.surrogate_keys)
+        self.timer.finish(request, response)
+        return response  # type: ignore[no-any-return]
+
+    def get_site_surrogate_key(self) -> str:
+        site = Site.find_for_request(self.request)
+        return site_key(site.pk) if site is not None else PAGES_KEY
 
     def check_valid_draft_code(self, page_id: int | None = None) -> bool:
         """Check computed hashes for the Date + PREVIEW_DRAFT_CODE + Page ID"""
-        settings_draft_code = getattr(settings, "PREVIEW_DRAFT_CODE", None)
-        if settings_draft_code:
-            user_draft_code = self.request.GET.get("draft")
-            if page_id is None:
-                page_id = self.request.parser_context["kwargs"].get("pk")
-            if user_draft_code and page_id:
-                settings_draft_code_hash = hash_draft_code(settings_draft_code, page_id)
-                if user_draft_code == settings_draft_code_hash:
-                    return True
-        return False
+        with self.timer.phase("draft"):
+            settings_draft_code = getattr(settings, "PREVIEW_DRAFT_CODE", None)
+            if settings_draft_code:
+                user_draft_code = self.request.GET.get("draft")
+                if page_id is None:
+                    page_id = self.request.parser_context["kwargs"].get("pk")
+                if user_draft_code and page_id:
+                    settings_draft_code_hash = hash_draft_code(
+                        settings_draft_code, page_id
+                    )
+                    if user_draft_code == settings_draft_code_hash:
+                        return True
+            return False
+
+    def get_page_state(self, pk: int, is_draft: bool = False) -> dict[str, Any] | None:
+        """
+        Revision and publishing metadata of a page, fetched without loading the page.
+        Returns None when the page isn't found.
+        """
+        resolved_page = self.resolved_page
+        if not is_draft and resolved_page is not None and resolved_page.pk == pk:
+            return {field: getattr(resolved_page, field) for field in PAGE_STATE_FIELDS}
+        resolved_draft_state = self.resolved_draft_state
+        if is_draft and resolved_draft_state and resolved_draft_state[0] == pk:
+            return resolved_draft_state[1]
+        queryset = Page.objects.all() if is_draft else self.get_queryset()
+        with self.timer.phase("queryset"):
+            return queryset.filter(pk=pk).values(*PAGE_STATE_FIELDS).first()  # type: ignore[no-any-return]
+
+    def get_page_validators(
+        self, pk: int, state: dict[str, Any], is_draft: bool = False
+    ) -> tuple[str, datetime | None]:
+        """ETag and Last-Modified for a page detail response"""
+        if is_draft:
+            revision_id = state["latest_revision_id"]
+            last_modified = state["latest_revision_created_at"]
+        else:
+            revision_id = state["live_revision_id"]
+            last_modified = state["last_published_at"]
+        site = Site.find_for_request(self.request)
+        etag = hash_etag(
+            "draft" if is_draft else "live",
+            pk,
+            revision_id,
+            last_modified.isoformat() if last_modified else "",
+            self.request.GET.get("fields", ""),
+            site.pk if site else "",
+            getattr(self.request, "accepted_media_type", ""),
+        )
+        return etag, last_modified
 
     def detail_view(
         self, request: Request, pk: int, is_draft_code_valid: bool = False
-    ) -> Response:
-        if is_draft_code_valid or self.check_valid_draft_code(pk):
+    ) -> HttpResponseBase:
+        is_draft = is_draft_code_valid or self.check_valid_draft_code(pk)
+        state = self.get_page_state(pk, is_draft=is_draft)
+        if self.surrogate_keys_enabled:
+            self.surrogate_keys.add(page_key(pk))
+            if state is not None:
+                self.surrogate_keys.add(type_key(state["content_type_id"]))
+        validators = self.get_page_validators(pk, state, is_draft) if state else None
+        if validators:
+            etag, last_modified = validators
+            not_modified = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=int(last_modified.timestamp()) if last_modified else None,
+            )
+            if not_modified is not None:
+                return not_modified
+
+        if is_draft:
+            if state is None:
+                raise Http404("not found")
             # hacky solution in order to get draft pages in get_queryset()
             self.kwargs["is_draft_code_valid"] = True
+            response = Response(self.get_draft_data(pk, state))
+        elif state is not None:
+            response = self.get_published_response(pk, state)
+        else:
+            with self.timer.phase("serialize"):
+                response = super().detail_view(request, pk)
+
+        if validators:
+            response.headers.setdefault("ETag", etag)
+            if last_modified:
+                response.headers.setdefault(
+                    "Last-Modified", http_date(last_modified.timestamp())
+                )
+        return response
+
+    def get_published_response(self, pk: int, state: dict[str, Any]) -> Response:
+        """Detail response of a live page, from the response cache when it is enabled"""
+        content_type = ContentType.objects.get_for_id(state["content_type_id"])
+        endpoint = "detail" if self.action == "detail_view" else "detail_by_path"
+        config = get_response_cache_config(
+            endpoint, [f"{content_type.app_label}.{content_type.model}"]
+        )
+        if config is None:
+            with self.timer.phase("serialize"):
+                return super().detail_view(self.request, pk)  # type: ignore[no-any-return]
 
-            # Get all, not just live
-            instance = get_object_or_404(Page.objects.all(), pk=pk).specific
-            instance = instance.get_latest_revision_as_object()
-            serializer = self.get_serializer(instance)
-            return Response(serializer.data)
-        return super().detail_view(request, pk)  # type: ignore[no-any-return]
+        version = get_version(page_version_name(pk))
+        request_hash = self.get_request_cache_hash(
+            state["live_revision_id"], state["last_published_at"]
+        )
+        cache_key = f"{KEY_PREFIX}:response:detail:{pk}:{version}:{request_hash}"
+        data = get_cache().get(cache_key)
+        if data is not None:
+            return Response(data)
+        with self.timer.phase("serialize"):
+            response = super().detail_view(self.request, pk)
+        if response.status_code == 200:
+            get_cache().set(cache_key, response.data, config.get("TIMEOUT", 300))
+        return response  # type: ignore[no-any-return]
+
+    def listing_view(self, request: Request) -> Response:
+        page_types = request.GET.get("type", "").split(",")
+        config = get_response_cache_config(
+            "listing", [page_type for page_type in page_types if page_type]
+        )
+        if config is None:
+            with self.timer.phase("serialize"):
+                return super().listing_view(request)  # type: ignore[no-any-return]
+
+        # Pages behind view restrictions are left out depending on the request
+        failed_restrictions = [
+            restriction.pk
+            for restriction in PageViewRestriction.objects.all()
+            if not restriction.accept_request(request)
+        ]
+        version = get_version(PAGES_VERSION)
+        request_hash = self.get_request_cache_hash(failed_restrictions)
+        cache_key = f"{KEY_PREFIX}:response:listing:{version}:{request_hash}"
+        data = get_cache().get(cache_key)
+        if data is not None:
+            return Response(data)
+        with self.timer.phase("serialize"):
+            response = super().listing_view(request)
+        if response.status_code == 200:
+            get_cache().set(cache_key, response.data, config.get("TIMEOUT", 300))
+        return response  # type: ignore[no-any-return]
+
+    def paginate_queryset(self, queryset: PageQuerySet) -> Any:
+        """Load the related objects the requested fields show along with the pages"""
+        if isinstance(queryset, QuerySet):
+            # Not search results
+            plan = get_prefetch_plan(
+                queryset.model,
+                self.request.GET.get("fields", ""),
+                lambda: self.get_listing_serializer_class(queryset.model),
+            )
+            queryset = plan.apply(queryset)
+        return super().paginate_queryset(queryset)
+
+    def get_listing_serializer_class(self, model: type[Page]) -> type[BaseSerializer]:
+        """Listing serializer class for model, honoring the `fields` query parameter"""
+        try:
+            fields_config = parse_fields_parameter(self.request.GET.get("fields", ""))
+        except ValueError as e:
+            raise BadRequestError(f"fields error: {e}")
+        return self._get_serializer_class(  # type: ignore[no-any-return]
+            self.request.wagtailapi_router, model, fields_config
+        )
+
+    def get_request_cache_hash(self, *parts: object) -> str:
+        """Hash of the query parameters and site that affect serialized output"""
+        site = Site.find_for_request(self.request)
+        query = sorted(
+            (key, values)
+            for key, values in self.request.GET.lists()
+            if key not in ("html_path", "draft")
+        )
+        return hash_etag(*parts, query, site.pk if site else "").strip('"')
+
+    def get_draft_data(self, pk: int, state: dict[str, Any]) -> Any:
+        """
+        Serialized latest revision of a page. A revision never changes once saved, so the
+        output is cached by revision id (and the parameters that affect serialization).
+        """
+        cache_key = None
+        if state["latest_revision_id"]:
+            revision_id = state["latest_revision_id"]
+            request_hash = self.get_request_cache_hash(
+                state["latest_revision_created_at"],
+                state["has_unpublished_changes"],
+                state["last_published_at"],
+            )
+            cache_key = f"{KEY_PREFIX}:draft:{pk}:{revision_id}:{request_hash}"
+            data = get_cache().get(cache_key)
+            if data is not None:
+                return data
+
+        with self.timer.phase("draft"):
+            instance = self.get_draft_object(pk, state)
+        with self.timer.phase("serialize"):
+            serializer_class = self.get_detail_serializer_class(type(instance))
+            data = serializer_class(
+                instance, context=self.get_serializer_context()
+            ).data
+        if cache_key:
+            get_cache().set(
+                cache_key, data, getattr(settings, "SPA_DRAFT_CACHE_TIMEOUT", 3600)
+            )
+        return data
+
+    def get_draft_object(self, pk: int, state: dict[str, Any]) -> Page:
+        """Load the specific page together with its latest revision in one query"""
+        model = ContentType.objects.get_for_id(state["content_type_id"]).model_class()
+        if model is None or not issubclass(model, Page):
+            page = get_object_or_404(Page.objects.all(), pk=pk).specific
+            return page.get_latest_revision_as_object()
+
+        instance: Page = get_object_or_404(
+            model._default_manager.select_related("latest_revision"), pk=pk
+        )
+        if instance.has_unpublished_changes and instance.latest_revision:
+            # Same as Page.get_latest_revision_as_object()
+            instance = instance.with_content_json(instance.latest_revision.content)
+        return instance
 
     def find_view(
         self, request: Request
@@ -89,39 +398,45 @@ class SPAExtendedPagesAPIEndpoint(PagesAPIViewSet):
 
     def route(self, page: Page, request: Request, path_components: list[str]) -> Page:
         """Alternative version of Page.route that supports draft pages"""
-        if path_components:
-            # request is for a child of this page
-            child_slug = path_components[0]
-            remaining_components = path_components[1:]
-
-            # Look for page slug first.
-            # Luckily, wagtail admin will not allow even a draft to have a slug that matches a published page
-            subpage = page.get_children().filter(slug=child_slug).first()
-            if not subpage:
-                # Look in revisions if page slug not found
-
-                # It's possible that multiple revision slugs exist for two different pages.
-                # In such a case, it picks the page with the most recent revision. The hash will then fail and 404. This is a limitation.
-                # In theory we could work around this by returning all matching pages and checking the draft hash of each one
-                # Merge requests welcome
-                revision_qs = Revision.objects.filter(
-                    object_id__in=page.get_descendants().values_list("pk"),
-                    content__slug=child_slug,
-                ).order_by("-created_at")
-                if len(revision_qs):
-                    subpage = revision_qs.first().content_object
-                else:
-                    raise Http404
-
-                # Confirm exact revision slug data (contains is not exact enough)
-                revision_slug = subpage.get_latest_revision().content.get("slug")
-                if revision_slug != child_slug:
-                    raise Http404
-
-            return self.route(subpage, request, remaining_components)
-        return page
+        candidates = self.route_candidates(page, request, path_components)
+        if not candidates:
+            raise Http404
+        return candidates[0]
+
+    def route_candidates(
+        self, page: Page, request: Request, path_components: list[str]
+    ) -> list[Page]:
+        """
+        Return every page the path may refer to, most recently edited first.
 
-    def detail_by_path_view(self, request: Request) -> Response:
+        Draft slugs may be shared by several pages, the draft hash should be checked
+        against each candidate.
+        """
+        if not path_components:
+            return [page]
+
+        # request is for a child of this page
+        child_slug = path_components[0]
+        remaining_components = path_components[1:]
+
+        # Look for page slug first.
+        # Luckily, wagtail admin will not allow even a draft to have a slug that matches a published page
+        subpage = page.get_children().filter(slug=child_slug).first()
+        if subpage:
+            subpages = [subpage]
+        else:
+            # Look for descendants whose latest revision has this slug
+            subpages = find_draft_slug_candidates(page, child_slug)
+
+        return [
+            candidate
+            for subpage in subpages
+            for candidate in self.route_candidates(
+                subpage, request, remaining_components
+            )
+        ]
+
+    def detail_by_path_view(self, request: Request) -> HttpResponseBase:
         """
         This should work similar to find_view except that it returns the detail response instead
         of a redirect. It also supports draft codes.
@@ -136,26 +451,181 @@ class SPAExtendedPagesAPIEndpoint(PagesAPIViewSet):
             # We have to reimplement some of wagtail's logic to include unpublished pages
             if not hasattr(self.request, "_wagtail_site"):
                 raise BadRequestError("Site not found")
-            root_page = self.request._wagtail_site.root_page.specific
+            root_page = self.request._wagtail_site.root_page
             path = request.GET["html_path"]
             path_components = [component for component in path.split("/") if component]
-            obj = self.route(root_page, request, path_components)
-            if obj and self.check_valid_draft_code(obj.id):
-                self.kwargs["pk"] = obj.pk
-                return self.detail_view(request, obj.pk, is_draft_code_valid=True)
+            with self.timer.phase("route"):
+                candidates = self.route_candidates(root_page, request, path_components)
+            if not candidates:
+                return self.path_not_found(request)
+            for obj in candidates:
+                if self.check_valid_draft_code(obj.id):
+                    self.kwargs["pk"] = obj.pk
+                    return self.detail_view(request, obj.pk, is_draft_code_valid=True)
 
         try:
-            obj = self.find_object(queryset, request)
+            with self.timer.phase("route"):
+                obj = self.find_object(queryset, request)
 
             if obj is None:
                 raise self.model.DoesNotExist
 
         except self.model.DoesNotExist:
-            raise Http404("not found")
+            return self.path_not_found(request)
 
         self.kwargs["pk"] = obj.pk
+        if obj.live:
+            self.resolved_page = obj
         return self.detail_view(request, obj.pk)
 
+    def path_not_found(self, request: Request) -> Response:
+        """
+        Not found response for `html_path`. With SPA_DETAIL_BY_PATH_REDIRECTS set it
+        carries the redirect for the path, if there is one, so clients don't have to
+        ask the redirects endpoint.
+        """
+        if (
+            getattr(settings, "SPA_DETAIL_BY_PATH_REDIRECTS", False)
+            and "html_path" in request.GET
+        ):
+            # Creating a redirect changes this response
+            self.surrogate_keys.add(REDIRECTS_KEY)
+            redirect = resolve_redirect(
+                Site.find_for_request(request), request.GET["html_path"]
+            )
+            if redirect is not None:
+                return Response(
+                    {"message": "not found", "redirect": redirect}, status=404
+                )
+        raise Http404("not found")
+
+    def find_object(self, queryset: PageQuerySet, request: Request) -> Page | None:
+        """
+        Look up `html_path` in the path index before walking the page tree.
+        Pages found by walking the tree are added to the index.
+        """
+        site = Site.find_for_request(request)
+        html_path = request.GET.get("html_path")
+        if html_path is None or site is None:
+            return super().find_object(queryset, request)
+        return self.find_page_by_html_path(queryset, site, html_path)
+
+    def find_page_by_html_path(
+        self, queryset: PageQuerySet, site: Site, html_path: str
+    ) -> Page | None:
+        obj = find_page_by_path(queryset, site, html_path)
+        if obj is not None:
+            return obj
+
+        path_components = [component for component in html_path.split("/") if component]
+        try:
+            page, _, _ = site.root_page.specific.route(self.request, path_components)
+        except Http404:
+            return None
+        if not queryset.filter(id=page.id).exists():
+            return None
+        index_page_path(site, html_path, page)
+        return page
+
+    def batch_view(self, request: Request) -> Response:
+        """
+        Detail responses for several pages at once, given as repeated `html_path` and/or
+        `id` query parameters. Pages that aren't found are reported inline with a 404
+        status instead of failing the whole batch. Drafts are not supported.
+        """
+        html_paths = request.GET.getlist("html_path")
+        ids = request.GET.getlist("id")
+        limit_max = getattr(settings, "WAGTAILAPI_LIMIT_MAX", 20)
+        if limit_max and len(html_paths) + len(ids) > limit_max:
+            raise BadRequestError(f"batch may not contain more than {limit_max} pages")
+
+        queryset = self.get_queryset()
+        site = Site.find_for_request(request)
+
+        # Resolve paths in bulk through the path index, then route the misses
+        page_ids_by_path = (
+            find_page_ids_by_paths(queryset, site, html_paths) if site else {}
+        )
+        for html_path in html_paths:
+            if html_path not in page_ids_by_path and site is not None:
+                page = self.find_page_by_html_path(queryset, site, html_path)
+                if page is not None:
+                    page_ids_by_path[html_path] = page.pk
+
+        requested: list[tuple[str, str, int | None]] = [
+            ("html_path", html_path, page_ids_by_path.get(html_path))
+            for html_path in html_paths
+        ] + [("id", pk, int(pk) if pk.isdigit() else None) for pk in ids]
+        pages = {
+            page.pk: page
+            for page in queryset.filter(
+                pk__in={pk for _, _, pk in requested if pk is not None}
+            ).specific()
+        }
+
+        context = self.get_serializer_context()
+        serializer_classes: dict[type[Page], type[BaseSerializer]] = {}
+        items = []
+        for key, value, pk in requested:
+            page = pages.get(pk) if pk is not None else None
+            if page is None:
+                items.append({key: value, "status": 404, "message": "not found"})
+                if self.surrogate_keys_enabled:
+                    self.surrogate_keys.add(self.get_site_surrogate_key())
+                continue
+            if self.surrogate_keys_enabled:
+                self.surrogate_keys.add(page_key(page.pk))
+            model = type(page)
+            if model not in serializer_classes:
+                serializer_classes[model] = self.get_detail_serializer_class(model)
+            serializer = serializer_classes[model](page, context=context)
+            items.append({key: value, "status": 200, "data": serializer.data})
+        return Response({"items": items})
+
+    def routes_view(self, request: Request) -> HttpResponseBase:
+        """
+        Every routable path of the site with its page id and type, in columnar form.
+        With `?since=<version>` only routes added or changed since that version are
+        listed, plus the ids of removed pages. When that version is no longer known the
+        full manifest is returned, flagged with `"full": true`.
+        """
+        if "site" in request.GET:
+            sites = find_sites(request.GET["site"])
+            if len(sites) != 1:
+                raise Http404("site not found")
+            site = sites[0]
+        else:
+            site = Site.find_for_request(request)
+            if site is None:
+                raise Http404("site not found")
+
+        manifest = get_route_manifest(site)
+        since = request.GET.get("since")
+        if since and since != manifest.version:
+            older = get_older_route_manifest(site, since)
+            if older is not None:
+                return Response(get_route_manifest_delta(manifest, older))
+
+        etag = quote_etag(manifest.version)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        if since == manifest.version:
+            return Response(get_route_manifest_delta(manifest, manifest))
+        response = HttpResponse(manifest.content, content_type="application/json")
+        response.headers["ETag"] = etag
+        return response
+
+    def get_detail_serializer_class(self, model: type[Page]) -> type[BaseSerializer]:
+        """Detail serializer class for model, honoring the `fields` query parameter"""
+        try:
+            fields_config = parse_fields_parameter(self.request.GET.get("fields", ""))
+        except ValueError as e:
+            raise BadRequestError(f"fields error: {e}")
+        return self._get_serializer_class(  # type: ignore[no-any-return]
+            self.request.wagtailapi_router, model, fields_config, show_details=True
+        )
+
     def get_queryset(self, include_drafts: bool = False) -> PageQuerySet:
         """
         Override this to allow for providing drafts
@@ -171,32 +641,69 @@ class SPAExtendedPagesAPIEndpoint(PagesAPIViewSet):
             return queryset
         """
         self.set_request_site()
-        queryset = super().get_queryset()
-        if include_drafts or self.kwargs.get("is_draft_code_valid"):
-            queryset = queryset | Page.objects.filter(live=False)
-        else:
-            queryset = queryset.public()
+        with self.timer.phase("queryset"):
+            queryset = super().get_queryset()
+            if include_drafts or self.kwargs.get("is_draft_code_valid"):
+                queryset = queryset | Page.objects.filter(live=False)
+            else:
+                queryset = queryset.public()
 
-        queryset = self.exclude_page_types(queryset)
+            queryset = self.exclude_page_types(queryset)
         return queryset
 
+    def get_object(self) -> Page:
+        with self.timer.phase("queryset"):
+            return super().get_object()
+
     def set_request_site(self) -> None:
-        site_hostname = self.request.GET.get("site", None)
-        if site_hostname:
-            try:
-                site = Site.objects.get(hostname=site_hostname)
-                self.request._wagtail_site = site
-            except Site.DoesNotExist:
-                pass
+        with self.timer.phase("site"):
+            set_request_site(self.request)
+
+    def get_base_queryset(self) -> PageQuerySet:
+        """
+        Same as wagtail's, except the `site` query parameter is resolved through the
+        site index rather than queried on every request.
+        """
+        if "site" not in self.request.GET:
+            return super().get_base_queryset()
+
+        with self.timer.phase("site"):
+            sites = find_sites(self.request.GET["site"])
+        if len(sites) > 1:
+            raise BadRequestError(
+                "Your query returned multiple sites. Try adding a port number to your site filter."
+            )
+
+        # Get all live pages
+        queryset = Page.objects.all().live()
+
+        # Exclude pages that the user doesn't have access to
+        for restriction in PageViewRestriction.objects.all().select_related("page"):
+            if not restriction.accept_request(self.request):
+                queryset = queryset.not_descendant_of(restriction.page, inclusive=True)
+
+        if not sites:
+            return queryset.none()
+
+        root_page = sites[0].root_page
+        base_queryset = queryset
+        queryset = base_queryset.descendant_of(root_page, inclusive=True)
+
+        # If internationalisation is enabled, include pages from other language trees
+        if getattr(settings, "WAGTAIL_I18N_ENABLED", False):
+            for translation in root_page.get_translations():
+                queryset |= base_queryset.descendant_of(translation, inclusive=True)
+
+        return queryset
 
     def exclude_page_types(self, queryset: PageQuerySet) -> PageQuerySet:
         exclude_type = self.request.GET.get("exclude_type", None)
         if exclude_type is not None:
             try:
-                models = page_models_from_string(exclude_type)
+                content_type_ids = content_type_ids_from_string(exclude_type)
             except (LookupError, ValueError):
                 raise BadRequestError("type doesn't exist")
-            queryset = exclude_page_type(queryset, models)
+            queryset = queryset.exclude(content_type_id__in=content_type_ids)
         return queryset
 
     @classmethod
@@ -209,10 +716,18 @@ class SPAExtendedPagesAPIEndpoint(PagesAPIViewSet):
                 name="detail_by_path",
             )
         )
+        urlpatterns.append(
+            path("batch/", cls.as_view({"get": "batch_view"}), name="batch")
+        )
+        urlpatterns.append(
+            path("routes/", cls.as_view({"get": "routes_view"}), name="routes")
+        )
         return urlpatterns  # type: ignore[no-any-return]
 
 
-class RedirectViewSet(viewsets.ReadOnlyModelViewSet[Redirect]):
+class RedirectViewSet(
+    ConfigurableRenderersMixin, viewsets.ReadOnlyModelViewSet[Redirect]
+):
     queryset = Redirect.objects.all()
     serializer_class = RedirectSerializer
     permission_classes = (permissions.AllowAny,)
@@ -220,6 +735,67 @@ class RedirectViewSet(viewsets.ReadOnlyModelViewSet[Redirect]):
     filterset_class = RedirectFilter
     model = Redirect
 
+    def finalize_response(
+        self, request: Request, response: Response, *args: Any, **kwargs: Any
+    ) -> Response:
+        response = super().finalize_response(request, response, *args, **kwargs)
+        add_surrogate_keys(response, [REDIRECTS_KEY])
+        return response
+
+    @action(detail=False)
+    def snapshot(self, request: Request) -> HttpResponse:
+        """
+        Every redirect that applies to the `site` query parameter (or all redirects) as one
+        pre-serialized, versioned document. Clients should refresh it with If-None-Match.
+        """
+        site = None
+        if "site" in request.GET:
+            sites = find_sites(request.GET["site"])
+            if len(sites) != 1:
+                raise Http404("site not found")
+            site = sites[0]
+
+        version = get_redirects_version()
+        gzipped = accepts_encoding(request.headers.get("Accept-Encoding", ""), "gzip")
+        etag = get_redirect_snapshot_etag(site, version, "gzip" if gzipped else None)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            patch_vary_headers(not_modified, ["Accept-Encoding"])
+            return not_modified
+
+        snapshot = get_redirect_snapshot(site, version)
+        if gzipped:
+            response = HttpResponse(
+                snapshot.gzipped_content, content_type="application/json"
+            )
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(snapshot.content, content_type="application/json")
+        response.headers["ETag"] = etag
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    @action(detail=False)
+    def resolve(self, request: Request) -> Response:
+        """
+        The redirect for `html_path`, normalised the way wagtail normalises redirect paths.
+        Uses the `site` query parameter, or the request's site.
+        """
+        if "html_path" not in request.GET:
+            raise ValidationError({"html_path": "This query parameter is required."})
+        if "site" in request.GET:
+            sites = find_sites(request.GET["site"])
+            if len(sites) != 1:
+                raise Http404("site not found")
+            site = sites[0]
+        else:
+            site = Site.find_for_request(request)
+
+        redirect = resolve_redirect(site, request.GET["html_path"])
+        if redirect is None:
+            raise Http404("not found")
+        return Response(redirect)
+
     @classmethod
     def get_urlpatterns(cls) -> list[URLPattern]:
         """
@@ -227,20 +803,131 @@ class RedirectViewSet(viewsets.ReadOnlyModelViewSet[Redirect]):
         """
         return [
             path("", cls.as_view({"get": "list"})),
+            path("resolve/", cls.as_view({"get": "resolve"}), name="resolve"),
+            path("snapshot/", cls.as_view({"get": "snapshot"}), name="snapshot"),
         ]
 
 
+class ChangeLogViewSet(viewsets.GenericViewSet[ChangeLogEntry]):
+    """
+    Change log entries in the order they were written. Clients pass the `cursor` of the
+    previous response as `?after=` to get the entries written since, `?after=latest`
+    returns no entries and the cursor to start following the log from.
+    """
+
+    queryset = ChangeLogEntry.objects.order_by("pk")
+    serializer_class = ChangeLogEntrySerializer
+    permission_classes = (permissions.AllowAny,)
+    model = ChangeLogEntry
+
+    def listing_view(self, request: Request) -> Response:
+        queryset = self.get_queryset()
+        after = request.GET.get("after", "0")
+        if after == "latest":
+            latest = queryset.values_list("pk", flat=True).last()
+            return Response({"entries": [], "cursor": latest or 0, "has_more": False})
+        try:
+            after_id = int(after)
+            limit = int(request.GET.get("limit", CHANGE_LOG_LIMIT))
+        except ValueError:
+            raise ValidationError("after and limit must be integers")
+        limit = max(min(limit, CHANGE_LOG_LIMIT_MAX), 1)
+
+        if "site" in request.GET:
+            sites = find_sites(request.GET["site"])
+            if len(sites) != 1:
+                raise Http404("site not found")
+            # Redirects without a site apply to every site
+            queryset = queryset.filter(Q(site_id=sites[0].pk) | Q(site_id__isnull=True))
+
+        entries = list(queryset.filter(pk__gt=after_id)[: limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        context = {
+            **self.get_serializer_context(),
+            "site_hostnames": dict(Site.objects.values_list("pk", "hostname")),
+        }
+        return Response(
+            {
+                "entries": ChangeLogEntrySerializer(
+                    entries, many=True, context=context
+                ).data,
+                "cursor": entries[-1].pk if entries else after_id,
+                "has_more": has_more,
+            }
+        )
+
+    @classmethod
+    def get_urlpatterns(cls) -> list[URLPattern]:
+        return [path("", cls.as_view({"get": "listing_view"}), name="listing")]
+
+
+# Set by django's sitemap views
+SITEMAP_ROBOTS_TAG = "noindex, noodp, noarchive"
+
+
 def sitemap(
     request: HttpRequest,
     sitemaps: dict[str, Sitemap] | None = None,
     **kwargs: dict[str, Any],
-) -> TemplateResponse:
-    """Extended wagtail sitemap view. Adds `site` query parameter to site hostname"""
-    hostname = request.GET.get("site", None)
-    if hostname:
-        try:
-            request._wagtail_site = Site.objects.get(hostname=hostname)  # type: ignore[attr-defined]
-        except Site.DoesNotExist:
-            pass
+) -> HttpResponseBase:
+    """
+    Extended wagtail sitemap view. Adds `site` query parameter to site hostname.
+
+    Sites with more than SPA_SITEMAP_PAGE_SIZE pages get a sitemap index, the sitemaps it
+    lists are requested with the `p` query parameter. Sitemaps are stored pre-rendered
+    and only the chunks holding a changed page are rendered again. Custom `sitemaps`,
+    or any of the `template_name`, `content_type`... options of django's sitemap view,
+    are rendered by wagtail's sitemap view.
+    """
+    set_request_site(request)
+    if sitemaps or kwargs:
+        return wagtail_sitemap(request, sitemaps=sitemaps, **kwargs)  # type: ignore[no-any-return]
 
-    return wagtail_sitemap(request, sitemaps=sitemaps, **kwargs)  # type: ignore[no-any-return]
+    site = get_sitemap_site(request)
+    if "p" in request.GET:
+        try:
+            chunk = int(request.GET["p"])
+        except ValueError:
+            raise Http404(f"No page '{request.GET['p']}'")
+    else:
+        version, layout = get_sitemap_layout(site)
+        if len(layout) > 1:
+            etag = hash_etag(version, len(layout), request.get_full_path())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                content = render_sitemap_index(
+                    get_sitemap_chunk_url(request, chunk)
+                    for chunk in range(1, len(layout) + 1)
+                )
+                response = HttpResponse(content, content_type="application/xml")
+            response["ETag"] = etag
+            response["X-Robots-Tag"] = SITEMAP_ROBOTS_TAG
+            add_surrogate_keys(response, [SITEMAP_KEY, site_key(site.pk)])
+            return response
+        chunk = 1
+
+    sitemap_chunk = get_sitemap_chunk(site, request, chunk - 1)
+    if sitemap_chunk is None:
+        raise Http404(f"Page {chunk} empty")
+    if not isinstance(sitemap_chunk, SitemapChunk):
+        # Rendered while streaming, its ETag isn't known until the end
+        streaming_response = StreamingHttpResponse(
+            sitemap_chunk, content_type="application/xml"
+        )
+        streaming_response["X-Robots-Tag"] = SITEMAP_ROBOTS_TAG
+        add_surrogate_keys(streaming_response, [SITEMAP_KEY, site_key(site.pk)])
+        return streaming_response
+    response = get_conditional_response(
+        request,
+        etag=sitemap_chunk.etag,
+        last_modified=sitemap_chunk.last_modified,
+    )
+    if response is None:
+        response = HttpResponse(sitemap_chunk.content, content_type="application/xml")
+    response["ETag"] = sitemap_chunk.etag
+    if sitemap_chunk.last_modified is not None:
+        response["Last-Modified"] = http_date(sitemap_chunk.last_modified)
+    response["X-Robots-Tag"] = SITEMAP_ROBOTS_TAG
+    add_surrogate_keys(response, [SITEMAP_KEY, site_key(site.pk)])
+    return response